@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+# decode_samples.py: Regression check and timing of QR.decode() on samples/.
+#
+# Decodes every image in samples/, checks the data type qrtools recognises
+# against the one the file is named after and reports the best decode time
+# of each.  With --roundtrip the decoded data is also encoded again and the
+# new image decoded, which must give the same data back.  Exits with status
+# 1 if any sample fails.
+#
+# Usage: python benchmarks/decode_samples.py [--src] [--runs N] [--roundtrip]
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# sample file name -> expected data type
+EXPECTED = {
+    'bookmark': 'bookmark',
+    'email-address': 'email',
+    'email-message': 'emailmessage',
+    'geo': 'geo',
+    'mms': 'mms',
+    'phonebook': 'phonebook',
+    'sms': 'sms',
+    'telephone': 'telephone',
+    'text-non-ascii': 'text',
+    'text-plain': 'text',
+    'url': 'url',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode the sample images.')
+    parser.add_argument('--src', action='store_true',
+                        help='use src/qrtools.py instead of the installed package')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--roundtrip', action='store_true',
+                        help='encode the decoded data again (needs qrencode)')
+    args = parser.parse_args()
+    if args.src:
+        sys.path.insert(0, os.path.join(ROOT, 'src'))
+    from qrtools import QR
+
+    failures = 0
+    for filename in sorted(glob.glob(os.path.join(ROOT, 'samples', '*.png'))):
+        name = os.path.splitext(os.path.basename(filename))[0]
+        qr = QR()
+        times = []
+        for _ in range(args.runs):
+            start = time.time()
+            found = qr.decode(filename)
+            times.append(time.time() - start)
+        status = 'ok'
+        if not found:
+            status = 'NOT DECODED'
+        elif name in EXPECTED and qr.data_type != EXPECTED[name]:
+            status = 'got %s, expected %s' % (qr.data_type, EXPECTED[name])
+        elif args.roundtrip:
+            decoded = qr.data_decode[qr.data_type](qr.data)
+            if isinstance(decoded, dict):
+                decoded = tuple(decoded.items())
+            elif qr.data_type == 'text':
+                # decoding keeps the BOM that text is encoded with
+                decoded = decoded.lstrip('\ufeff')
+            again = QR(data=decoded, data_type=qr.data_type)
+            if again.encode() != 0 or not again.decode() or again.data != qr.data:
+                status = 'ROUNDTRIP FAILED'
+            again.destroy()
+        qr.destroy()
+        if status != 'ok':
+            failures += 1
+        print('%-16s %8.2f ms  %s' % (name, min(times) * 1000, status))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
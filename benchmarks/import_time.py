@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+# import_time.py: Benchmark of the time it takes to import qrtools.
+#
+# Runs `import qrtools` in fresh interpreters, reports the best time and
+# checks that the decoding and encoding backends were not imported with it.
+# Exits with status 1 if a backend was imported or the import took longer
+# than --max-ms milliseconds, so it can guard the import time in CI.
+#
+# Usage: python benchmarks/import_time.py [--src] [--runs N] [--max-ms MS]
+
+import argparse
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# modules `import qrtools` must not pull in
+LAZY = ['zbar', 'PIL', 'Image', 'cv2', 'subprocess', 'hashlib', 'shutil',
+        'sqlite3', 'multiprocessing', 'zlib']
+
+PROBE = '''
+import sys, time
+start = time.time()
+import qrtools
+elapsed = time.time() - start
+print(elapsed)
+print(' '.join(m for m in %r if m in sys.modules))
+''' % (LAZY,)
+
+
+def measure(src):
+    env = dict(os.environ)
+    if src:
+        env['PYTHONPATH'] = os.path.abspath(SRC)
+    output = subprocess.check_output(
+        [sys.executable, '-c', PROBE], env=env
+    ).decode('ascii').splitlines()
+    imported = output[1].split() if len(output) > 1 else []
+    return float(output[0]), imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark `import qrtools`.')
+    parser.add_argument('--src', action='store_true',
+                        help='import src/qrtools.py instead of the installed package')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='fail if the best import time is over this')
+    args = parser.parse_args()
+
+    times = []
+    imported = set()
+    for _ in range(args.runs):
+        elapsed, modules = measure(args.src)
+        times.append(elapsed * 1000)
+        imported.update(modules)
+
+    times.sort()
+    print('import qrtools: best %.2f ms, median %.2f ms over %d runs' % (
+        times[0], times[len(times) // 2], len(times)))
+    status = 0
+    if imported:
+        print('eagerly imported: %s' % ', '.join(sorted(imported)))
+        status = 1
+    if args.max_ms is not None and times[0] > args.max_ms:
+        print('over the %.2f ms budget' % args.max_ms)
+        status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+# robustness.py: Decode success rate and latency on degraded QR Codes.
+#
+# Encodes random payloads across versions and error correction levels with
+# the native encoder, degrades the images in controlled ways (blur, noise,
+# JPEG compression, rotation, perspective and downscaling, each at several
+# strengths) and runs every decode pipeline on them.  Reports the share of
+# codes decoded and the median and 95th percentile decode times per
+# pipeline, degradation and level as a table, and everything per version
+# too as JSON.  Given the JSON of an earlier run as --baseline, the table
+# shows the change in success rate against it.  A pipeline raising an
+# exception hasn't failed to decode: such calls are counted apart as errors,
+# and the first error of each pipeline is printed, or with --fail-fast
+# raised.
+#
+# Pipelines are qrtools.decode() on the PIL image ('decode') and
+# qrtools.decode_y800() on its pixels ('decode_y800'); --pipeline
+# module:function adds a function taking a grayscale PIL image and
+# returning the decoded strings.
+#
+# Usage: python benchmarks/robustness.py [--src] [--trials N]
+#            [--versions 1,3,7] [--levels LMQH] [--only blur,jpeg]
+#            [--pipeline module:function] [--json FILE] [--baseline FILE]
+#            [--fail-fast]
+
+import argparse
+import importlib
+import io
+import json
+import os
+import random
+import string
+import sys
+import time
+import traceback
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+PIXEL_SIZE = 4
+MARGIN_SIZE = 4
+
+# degradation -> strengths, mildest first
+STRENGTHS = {
+    'none': [0],
+    'blur': [0.5, 1.0, 1.5, 2.0, 3.0],          # Gaussian radius, in pixels
+    'noise': [10, 25, 50, 80],                   # Gaussian sigma, in levels
+    'jpeg': [50, 25, 10, 5],                     # JPEG quality
+    'rotate': [5, 15, 30, 45],                   # degrees
+    'perspective': [0.05, 0.1, 0.2, 0.3],        # top edge widened by
+    'scale': [0.75, 0.5, 0.35, 0.25],            # resize factor
+}
+
+
+def _image():
+    try:
+        from PIL import Image
+    except ImportError:
+        import Image
+    return Image
+
+
+def degrade(image, kind, strength):
+    """Returns a degraded copy of a grayscale PIL image."""
+    Image = _image()
+    from PIL import ImageChops, ImageFilter
+    width, height = image.size
+    if kind == 'none':
+        return image
+    if kind == 'blur':
+        return image.filter(ImageFilter.GaussianBlur(strength))
+    if kind == 'noise':
+        noise = Image.effect_noise(image.size, strength)
+        return ImageChops.add(image, noise, 1.0, -128)
+    if kind == 'jpeg':
+        buf = io.BytesIO()
+        image.save(buf, 'JPEG', quality=strength)
+        buf.seek(0)
+        return Image.open(buf).convert('L')
+    if kind == 'rotate':
+        return image.rotate(strength, Image.BILINEAR, expand=True, fillcolor=255)
+    if kind == 'perspective':
+        # map a quadrilateral wider at the top onto the image, which shrinks
+        # the top of the code like a label seen from below
+        d = strength * width
+        quad = (-d, 0, 0, height, width, height, width + d, 0)
+        return image.transform(image.size, Image.QUAD, quad, Image.BILINEAR,
+                               fillcolor=255)
+    if kind == 'scale':
+        size = (max(1, int(width * strength)), max(1, int(height * strength)))
+        return image.resize(size, Image.BILINEAR)
+    raise ValueError("unknown degradation %r" % (kind,))
+
+
+def make_code(qrencoder, qrpng, version, level, rng):
+    """Returns (payload, grayscale PIL image) of a random payload filling
+    version at level."""
+    length = qrencoder.capacity(version, level)
+    payload = ''.join(rng.choice(string.ascii_letters + string.digits)
+                      for _ in range(length))
+    code = qrencoder.make(payload.encode('ascii'), level, version)
+    png = qrpng.png_bytes(code.rows, PIXEL_SIZE, MARGIN_SIZE)
+    return payload, _image().open(io.BytesIO(png)).convert('L')
+
+
+def builtin_pipelines():
+    from qrtools import decode, decode_y800
+
+    def pil(image):
+        return [symbol.data for symbol in decode(image)]
+
+    def y800(image):
+        width, height = image.size
+        return [symbol.data for symbol in decode_y800(image.tobytes(), width, height)]
+
+    return {'decode': pil, 'decode_y800': y800}
+
+
+def load_pipeline(spec):
+    module, _, function = spec.partition(':')
+    return getattr(importlib.import_module(module), function)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(pipelines, versions, levels, kinds, trials, seed, fail_fast=False):
+    """Returns a list of result dicts, one per pipeline, degradation,
+    strength, level and version.  Exceptions raised by a pipeline are
+    counted as errors, not decodes, unless fail_fast re-raises them."""
+    try:
+        from qrtools import qrencoder, qrpng
+    except ImportError:
+        # src/qrtools.py rather than the package
+        import qrencoder
+        import qrpng
+    rng = random.Random(seed)
+    codes = [
+        (version, level, make_code(qrencoder, qrpng, version, level, rng))
+        for version in versions for level in levels for _ in range(trials)
+    ]
+    results = []
+    reported = set()
+    for kind in kinds:
+        for strength in STRENGTHS[kind]:
+            images = [
+                (version, level, payload, degrade(image, kind, strength))
+                for version, level, (payload, image) in codes
+            ]
+            for name, pipeline in pipelines.items():
+                cells = {}
+                for version, level, payload, image in images:
+                    cell = cells.setdefault((version, level), [0, 0, []])
+                    start = time.perf_counter()
+                    try:
+                        cell[0] += payload in pipeline(image)
+                    except Exception:
+                        if fail_fast:
+                            raise
+                        cell[1] += 1
+                        if name not in reported:
+                            reported.add(name)
+                            sys.stderr.write('%s failed on %s %s, version %d, '
+                                             'level %s:\n' % (
+                                name, kind, strength, version, level
+                            ))
+                            traceback.print_exc()
+                    cell[2].append(time.perf_counter() - start)
+                for (version, level), (decoded, errors, times) in \
+                        sorted(cells.items()):
+                    results.append({
+                        'pipeline': name, 'degradation': kind,
+                        'strength': strength, 'level': level,
+                        'version': version, 'trials': len(times),
+                        'decoded': decoded, 'errors': errors, 'times': times,
+                    })
+    return results
+
+
+def summarise(results):
+    """Merges the versions of results; returns {(pipeline, degradation,
+    strength, level): (success rate, error rate, median s, 95th percentile
+    s)}."""
+    groups = {}
+    for r in results:
+        key = (r['pipeline'], r['degradation'], r['strength'], r['level'])
+        group = groups.setdefault(key, [0, 0, 0, []])
+        group[0] += r['decoded']
+        # results written before errors were counted apart have none
+        group[1] += r.get('errors', 0)
+        group[2] += r['trials']
+        group[3].extend(r['times'])
+    return dict(
+        (key, (decoded / float(trials), errors / float(trials),
+               percentile(times, 0.5), percentile(times, 0.95)))
+        for key, (decoded, errors, trials, times) in groups.items()
+    )
+
+
+def report(results, baseline=None):
+    summary = summarise(results)
+    old = summarise(baseline) if baseline else {}
+    print('%-12s %-12s %8s %5s %8s %8s %10s %10s%s' % (
+        'pipeline', 'degradation', 'strength', 'level', 'decoded', 'errors',
+        'median ms', 'p95 ms', '    change' if baseline else ''
+    ))
+    def order(key):
+        pipeline, kind, strength, level = key
+        return (pipeline, list(STRENGTHS).index(kind),
+                STRENGTHS[kind].index(strength), 'LMQH'.index(level))
+
+    for key in sorted(summary, key=order):
+        rate, errors, median, p95 = summary[key]
+        change = ''
+        if key in old:
+            change = '  %+7.1f%%' % ((rate - old[key][0]) * 100)
+        print('%-12s %-12s %8s %5s %7.1f%% %7.1f%% %10.2f %10.2f%s' % (
+            key[0], key[1], key[2], key[3], rate * 100, errors * 100,
+            median * 1000, p95 * 1000, change
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Measure decoding of degraded QR Codes.'
+    )
+    parser.add_argument('--src', action='store_true',
+                        help='use src/qrtools.py instead of the installed package')
+    parser.add_argument('--trials', type=int, default=3,
+                        help='codes per version and level')
+    parser.add_argument('--versions', default='1,3,7,15,25')
+    parser.add_argument('--levels', default='LMQH')
+    parser.add_argument('--only', help='comma separated degradations to run')
+    parser.add_argument('--pipeline', action='append', default=[],
+                        help='module:function to measure too (may be repeated)')
+    parser.add_argument('--no-builtin', action='store_true',
+                        help='only measure the --pipeline functions')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fail-fast', action='store_true',
+                        help='stop at the first exception a pipeline raises')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    args = parser.parse_args()
+    if args.src:
+        sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+    pipelines = {} if args.no_builtin else builtin_pipelines()
+    for spec in args.pipeline:
+        pipelines[spec] = load_pipeline(spec)
+    kinds = args.only.split(',') if args.only else list(STRENGTHS)
+    for kind in kinds:
+        if kind not in STRENGTHS:
+            parser.error('unknown degradation %r' % kind)
+    versions = [int(v) for v in args.versions.split(',')]
+
+    results = run(pipelines, versions, args.levels, kinds, args.trials,
+                  args.seed, args.fail_fast)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    report(results, baseline)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'settings': {
+                    'trials': args.trials, 'versions': versions,
+                    'levels': args.levels, 'seed': args.seed,
+                    'pixel_size': PIXEL_SIZE, 'margin_size': MARGIN_SIZE,
+                    'strengths': dict((k, STRENGTHS[k]) for k in kinds),
+                },
+                'results': results,
+            }, f, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,4 +11,12 @@ setup(
     url="https://github.com/primetang/qrtools",
     packages=['qrtools'],
     package_dir={'qrtools': 'src'},
+    python_requires='>=3',
+    # encoding only needs the qrencode program; the decoders are optional.
+    # The zbar package on PyPI is Python 2 only, so the Python 3 zbar
+    # bindings have to come from the system (e.g. python3-zbar).
+    extras_require={
+        'decode': ['pillow'],
+        'video': ['pillow', 'opencv-python'],
+    },
 )
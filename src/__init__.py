@@ -1,4 +1 @@
-try:
-    from qrtools import *
-except ImportError:
-    from qrtools.qrtools import *
+from .qrtools import *
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+# qrbulk.py: Bulk encoding of contact cards from CSV and JSON Lines files.
+#
+# `qrbulk.py` is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# `qrbulk.py` is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along
+# with `qrbulk.py`.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A contact record is a dict of field names (in any case) to values, such as
+a row of a CSV file with a header line or an object on a line of a JSON
+Lines file.  Fields other than those in MECARD_FIELDS or VCARD_FIELDS are
+ignored, and so are empty values.
+
+Values are str, or lists or tuples of str: a list gives the components of
+the structured fields N (last name, first name) and ADR (PO box, room
+number, house number, city, prefecture, zip code, country), and several
+values of any other field.  In a str, the components of N and ADR are
+separated by commas, as in a MECARD typed by hand.  Other values, such as
+the numbers of a JSON object, are turned into str.
+"""
+
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+
+if __package__:
+    from .qrtools import EncodeOptions, encode
+    from .qrpng import write_archive
+else:
+    from qrtools import EncodeOptions, encode
+    from qrpng import write_archive
+
+MECARD_FIELDS = (
+    'N', 'SOUND', 'TEL', 'TEL-AV', 'EMAIL', 'NOTE', 'BDAY', 'ADR', 'URL',
+    'NICKNAME',
+)
+VCARD_FIELDS = (
+    'N', 'FN', 'NICKNAME', 'BDAY', 'ADR', 'TEL', 'EMAIL', 'TITLE', 'ORG',
+    'NOTE', 'URL',
+)
+STRUCTURED_FIELDS = ('N', 'ADR')
+
+# the native encoder and a quick mask choice: no qrencode process per card
+BULK_OPTIONS = EncodeOptions(level='M', encoder='native', mask='fast')
+
+_MECARD_ESCAPES = str.maketrans({
+    '\\': '\\\\', ';': '\\;', ':': '\\:', ',': '\\,',
+})
+_VCARD_ESCAPES = str.maketrans({
+    '\\': '\\\\', ';': '\\;', ',': '\\,', '\n': '\\n',
+})
+
+
+def mecard_escape(value):
+    """Escapes the characters MECARD gives a meaning to: \\ ; : and ,"""
+    return value.translate(_MECARD_ESCAPES)
+
+
+def vcard_escape(value):
+    """Escapes \\ ; , and line breaks for a vCard 3.0 property value."""
+    return value.replace('\r\n', '\n').replace('\r', '\n').translate(
+        _VCARD_ESCAPES
+    )
+
+
+def _empty(value):
+    return value is None or value == '' or value == [] or value == ()
+
+
+def _values(record, fields):
+    """Yields (field, value) for the non-empty values of the fields of
+    record, in the order of fields."""
+    values = {}
+    for key, value in record.items():
+        key = key.strip().upper() if key else key
+        if key in fields and not _empty(value):
+            values[key] = value
+    for field in fields:
+        if field not in values:
+            continue
+        value = values[field]
+        if isinstance(value, (list, tuple)):
+            if field in STRUCTURED_FIELDS:
+                yield field, ['' if c is None else str(c) for c in value]
+            else:
+                for v in value:
+                    if not _empty(v):
+                        yield field, str(v)
+        else:
+            yield field, str(value)
+
+
+def _components(value):
+    if isinstance(value, str):
+        value = value.split(',')
+    return [c.strip() for c in value]
+
+
+def mecard(record):
+    """Returns the MECARD text of a contact record."""
+    fields = []
+    for field, value in _values(record, MECARD_FIELDS):
+        if field in STRUCTURED_FIELDS:
+            value = ','.join(mecard_escape(c) for c in _components(value))
+        else:
+            value = mecard_escape(str(value))
+        fields.append('%s:%s;' % (field, value))
+    return 'MECARD:%s;' % ''.join(fields)
+
+
+def vcard(record):
+    """Returns the vCard 3.0 text of a contact record.  FN, which vCard
+    requires, is made of N if the record has no FN."""
+    lines = ['BEGIN:VCARD', 'VERSION:3.0']
+    values = list(_values(record, VCARD_FIELDS))
+    if 'FN' not in dict(values):
+        name = dict(values).get('N', '')
+        fn = ' '.join(c for c in reversed(_components(name)) if c)
+        values.insert(1 if values and values[0][0] == 'N' else 0, ('FN', fn))
+    for field, value in values:
+        if field in STRUCTURED_FIELDS:
+            value = ';'.join(vcard_escape(c) for c in _components(value))
+        else:
+            value = vcard_escape(str(value))
+        lines.append('%s:%s' % (field, value))
+    lines.append('END:VCARD')
+    return '\r\n'.join(lines)
+
+
+CARD_FORMATS = {'mecard': mecard, 'vcard': vcard}
+
+
+def read_records(source, format=None):
+    """Yields the contact records of source, a filename or a text file
+    object, one at a time.  format is 'csv' or 'jsonl'; by default it is
+    told by the file name, csv unless it ends in .jsonl or .ndjson."""
+    if format is None:
+        name = getattr(source, 'name', source)
+        if isinstance(name, str) and name.lower().endswith(('.jsonl', '.ndjson')):
+            format = 'jsonl'
+        else:
+            format = 'csv'
+    if format not in ('csv', 'jsonl'):
+        raise ValueError("format should be 'csv' or 'jsonl', not %r" % (format,))
+    if not hasattr(source, 'read'):
+        # utf-8-sig drops the byte order mark Excel starts CSV files with
+        with io.open(source, encoding='utf-8-sig', newline='') as f:
+            for record in read_records(f, format):
+                yield record
+        return
+    if format == 'csv':
+        for record in csv.DictReader(source):
+            yield record
+    else:
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _name(record, index, name_field):
+    name = None
+    if name_field is not None:
+        name = record.get(name_field)
+    if not name:
+        name = '%06d' % index
+    # keep the images at the top of the archive
+    return str(name).replace('/', '_').replace(os.sep, '_')
+
+
+_options = None
+
+
+def _init(options):
+    global _options
+    _options = options
+
+
+def _encode_card(job):
+    name, text = job
+    try:
+        result = encode(text.encode('utf-8'), _options)
+    except ValueError:
+        # too long for a QR Code
+        return name, None
+    return name, result.png
+
+
+def encode_cards(records, target, card='mecard', options=BULK_OPTIONS,
+                 archive='tar', name_field=None, processes=None, batch=256,
+                 skipped=None):
+    """Encodes a card for each of records (as read_records() yields them)
+    into an archive of PNG images, in a pool of processes (one per CPU if
+    None), and returns the number of images written.
+
+    card is 'mecard' or 'vcard'.  target and archive are as for
+    qrpng.write_archive().  Images are named by the record's name_field or
+    else its number.  Records are read and encoded batch per process at a
+    time, so memory use doesn't grow with the number of records.  Names of
+    records too long to encode are appended to skipped, if given."""
+    make_card = CARD_FORMATS[card]
+    jobs = (
+        (_name(record, index, name_field), make_card(record))
+        for index, record in enumerate(records)
+    )
+    pool = multiprocessing.Pool(processes, _init, (options,))
+    size = batch * (processes or multiprocessing.cpu_count())
+
+    def images():
+        while True:
+            chunk = list(itertools.islice(jobs, size))
+            if not chunk:
+                break
+            for name, png in pool.imap(_encode_card, chunk, 16):
+                if png is None:
+                    if skipped is not None:
+                        skipped.append(name)
+                    continue
+                yield name, png
+
+    try:
+        return write_archive(images(), target, archive)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Encode contact cards from a CSV or JSON Lines file '
+                    'into an archive of QR Code images.'
+    )
+    parser.add_argument('source', help='CSV or JSON Lines file of contacts')
+    parser.add_argument('target', help='tar or zip file to write')
+    parser.add_argument('--card', choices=sorted(CARD_FORMATS), default='mecard')
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'))
+    parser.add_argument('--name-field',
+                        help='field to name the images by (default: number)')
+    parser.add_argument('--level', choices='LMQH', default=BULK_OPTIONS.level)
+    parser.add_argument('--pixel-size', type=int, default=3)
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+    archive = 'zip' if args.target.lower().endswith('.zip') else 'tar'
+    options = BULK_OPTIONS.replace(level=args.level, pixel_size=args.pixel_size)
+    skipped = []
+    count = encode_cards(
+        read_records(args.source, args.input_format), args.target,
+        card=args.card, options=options, archive=archive,
+        name_field=args.name_field, processes=args.processes, skipped=skipped
+    )
+    print('%d cards written, %d too long' % (count, len(skipped)))
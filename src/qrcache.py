@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+# qrcache.py: Decode result caches keyed by image content.
+#
+# `qrcache.py` is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# `qrcache.py` is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along
+# with `qrcache.py`.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+if hasattr(hashlib, 'blake2b'):
+    def _hash():
+        return hashlib.blake2b(digest_size=16)
+else:
+    _hash = hashlib.sha1
+
+CHUNK_SIZE = 1 << 16
+
+
+def content_hash(data):
+    """Returns a hex key for a bytes-like object, eg. a raw pixel buffer."""
+    h = _hash()
+    h.update(data)
+    return h.hexdigest()
+
+
+def file_hash(filename):
+    """Returns a hex key for the contents of the file filename."""
+    h = _hash()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class _Cache(object):
+    """A cache maps content keys to the tuple of data decoded from them,
+    empty when nothing could be decoded.  Looking up a missing or expired key
+    raises KeyError.
+
+    ttl is how long decoded data is kept, in seconds (None for ever), and
+    negative_ttl how long a failed decode is remembered."""
+
+    def __init__(self, ttl=None, negative_ttl=300):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+
+    def expires(self, data):
+        ttl = self.ttl if data else self.negative_ttl
+        if ttl is None:
+            return None
+        return time.time() + ttl
+
+
+class MemoryCache(_Cache):
+    """An in-process cache holding at most maxsize results, least recently
+    used first out."""
+
+    def __init__(self, maxsize=1024, ttl=None, negative_ttl=300):
+        _Cache.__init__(self, ttl, negative_ttl)
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def __getitem__(self, key):
+        with self.lock:
+            data, expires = self.entries.pop(key)
+            if expires is not None and expires < time.time():
+                raise KeyError(key)
+            self.entries[key] = (data, expires)
+            return data
+
+    def __setitem__(self, key, data):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (data, self.expires(data))
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SQLiteCache(_Cache):
+    """A cache stored in the SQLite database at path, which may be shared
+    between processes and survives restarts."""
+
+    def __init__(self, path, ttl=None, negative_ttl=300):
+        import sqlite3
+        _Cache.__init__(self, ttl, negative_ttl)
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS decode_cache ('
+                'key TEXT PRIMARY KEY, data TEXT, expires REAL)'
+            )
+            self.db.commit()
+
+    def __getitem__(self, key):
+        with self.lock:
+            row = self.db.execute(
+                'SELECT data, expires FROM decode_cache WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            raise KeyError(key)
+        return tuple(json.loads(row[0]))
+
+    def __setitem__(self, key, data):
+        with self.lock:
+            self.db.execute(
+                'INSERT OR REPLACE INTO decode_cache VALUES (?, ?, ?)',
+                (key, json.dumps(list(data)), self.expires(data))
+            )
+            self.db.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute(
+                'SELECT COUNT(*) FROM decode_cache'
+            ).fetchone()[0]
+
+    def clear(self):
+        with self.lock:
+            self.db.execute('DELETE FROM decode_cache')
+            self.db.commit()
+
+    def purge(self):
+        """Deletes expired entries from the database."""
+        with self.lock:
+            self.db.execute(
+                'DELETE FROM decode_cache WHERE expires < ?', (time.time(),)
+            )
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,690 @@
+#!/usr/bin/env python3
+
+# qrencoder.py: In-process QR Code encoder.
+#
+# `qrencoder.py` is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# `qrencoder.py` is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along
+# with `qrencoder.py`.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Encodes byte payloads as QR Codes (ISO/IEC 18004, versions 1 to 40, byte
+mode) without running qrencode.
+
+Everything that doesn't depend on the payload is computed once and cached:
+the Galois field log/antilog tables, a 256-entry remainder table for every
+Reed-Solomon generator polynomial, the block layout of every version and
+level, and per version a template of the function patterns, the order in
+which data modules are placed and the eight mask patterns.
+
+Module rows are kept as Python ints (bit size - 1 - x is module x, 1 is
+dark), so masking a row is one XOR, and the mask penalty rules run on whole
+rows and columns at once through int and str operations.
+"""
+
+import operator
+
+# error correction levels -> format information bits
+LEVELS = {'L': 1, 'M': 0, 'Q': 3, 'H': 2}
+
+# error correction codewords per block, by level and version
+ECC_CODEWORDS_PER_BLOCK = {
+    'L': (None, 7, 10, 15, 20, 26, 18, 20, 24, 30, 18, 20, 24, 26, 30, 22,
+          24, 28, 30, 28, 28, 28, 28, 30, 30, 26, 28, 30, 30, 30, 30, 30, 30,
+          30, 30, 30, 30, 30, 30, 30, 30),
+    'M': (None, 10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24,
+          28, 28, 26, 26, 26, 26, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28,
+          28, 28, 28, 28, 28, 28, 28, 28),
+    'Q': (None, 13, 22, 18, 26, 18, 24, 18, 22, 20, 24, 28, 26, 24, 20, 30,
+          24, 28, 28, 26, 30, 28, 30, 30, 30, 30, 28, 30, 30, 30, 30, 30, 30,
+          30, 30, 30, 30, 30, 30, 30, 30),
+    'H': (None, 17, 28, 22, 16, 22, 28, 26, 26, 24, 28, 24, 28, 22, 24, 24,
+          30, 28, 28, 26, 28, 30, 24, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30,
+          30, 30, 30, 30, 30, 30, 30, 30),
+}
+
+# error correction blocks, by level and version
+ECC_BLOCKS = {
+    'L': (None, 1, 1, 1, 1, 1, 2, 2, 2, 2, 4, 4, 4, 4, 4, 6, 6, 6, 6, 7, 8,
+          8, 9, 9, 10, 12, 12, 12, 13, 14, 15, 16, 17, 18, 19, 19, 20, 21, 22,
+          24, 25),
+    'M': (None, 1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14,
+          16, 17, 17, 18, 20, 21, 23, 25, 26, 28, 29, 31, 33, 35, 37, 38, 40,
+          43, 45, 47, 49),
+    'Q': (None, 1, 1, 2, 2, 4, 4, 6, 6, 8, 8, 8, 10, 12, 16, 12, 17, 16, 18,
+          21, 20, 23, 23, 25, 27, 29, 34, 34, 35, 38, 40, 43, 45, 48, 51, 53,
+          56, 59, 62, 65, 68),
+    'H': (None, 1, 1, 2, 4, 4, 4, 5, 6, 8, 8, 11, 11, 16, 16, 18, 16, 19, 21,
+          25, 25, 25, 34, 30, 32, 35, 37, 40, 42, 45, 48, 51, 54, 57, 60, 63,
+          66, 70, 74, 77, 81),
+}
+
+MODE_BYTE = 0x4
+PAD_BYTES = (0xec, 0x11)
+
+# GF(256) with the QR Code polynomial x^8 + x^4 + x^3 + x^2 + 1; EXP is
+# doubled so that EXP[LOG[a] + LOG[b]] needs no modulo.
+EXP = [0] * 512
+LOG = [0] * 256
+_x = 1
+for _i in range(255):
+    EXP[_i] = _x
+    LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= 0x11d
+for _i in range(255, 512):
+    EXP[_i] = EXP[_i - 255]
+del _x, _i
+
+
+def gf_mul(a, b):
+    if a == 0 or b == 0:
+        return 0
+    return EXP[LOG[a] + LOG[b]]
+
+
+_generators = {}
+
+
+def generator(degree):
+    """Returns the Reed-Solomon generator polynomial of degree as a list of
+    coefficients, highest first, without the leading 1."""
+    poly = _generators.get(degree)
+    if poly is None:
+        poly = [1]
+        for i in range(degree):
+            # multiply by (x - a^i)
+            poly = [
+                c ^ gf_mul(p, EXP[i])
+                for c, p in zip(poly + [0], [0] + poly)
+            ]
+        poly = _generators[degree] = poly[1:]
+    return poly
+
+
+_remainder_tables = {}
+
+
+def remainder_table(degree):
+    """Returns, for every byte value f, f times the generator polynomial of
+    degree packed into an int of degree bytes."""
+    table = _remainder_tables.get(degree)
+    if table is None:
+        gen = generator(degree)
+        table = _remainder_tables[degree] = [0] + [
+            int.from_bytes(bytes(EXP[LOG[f] + LOG[g]] for g in gen), 'big')
+            for f in range(1, 256)
+        ]
+    return table
+
+
+def rs_remainder(data, degree):
+    """Returns the degree error correction codewords of data as bytes."""
+    table = remainder_table(degree)
+    shift = 8 * (degree - 1)
+    mask = (1 << 8 * degree) - 1
+    rem = 0
+    for b in data:
+        rem = ((rem << 8) & mask) ^ table[(rem >> shift) ^ b]
+    return rem.to_bytes(degree, 'big')
+
+
+def size_of(version):
+    return version * 4 + 17
+
+
+def raw_data_modules(version):
+    """Returns the number of modules left for codewords in version."""
+    result = (16 * version + 128) * version + 64
+    if version >= 2:
+        aligns = version // 7 + 2
+        result -= (25 * aligns - 10) * aligns - 55
+        if version >= 7:
+            result -= 36
+    return result
+
+
+def alignment_positions(version):
+    if version == 1:
+        return []
+    aligns = version // 7 + 2
+    if version == 32:
+        step = 26
+    else:
+        step = (version * 4 + aligns * 2 + 1) // (aligns * 2 - 2) * 2
+    size = size_of(version)
+    return [6] + [size - 7 - i * step for i in range(aligns - 2, -1, -1)]
+
+
+_layouts = {}
+
+
+def block_layout(version, level):
+    """Returns (data codewords, error correction codewords per block, data
+    codewords of each block) for version and level."""
+    key = (version, level)
+    layout = _layouts.get(key)
+    if layout is None:
+        blocks = ECC_BLOCKS[level][version]
+        ecc = ECC_CODEWORDS_PER_BLOCK[level][version]
+        raw = raw_data_modules(version) // 8
+        short = blocks - raw % blocks
+        short_len = raw // blocks - ecc
+        lengths = [short_len] * short + [short_len + 1] * (blocks - short)
+        layout = _layouts[key] = (sum(lengths), ecc, lengths)
+    return layout
+
+
+def count_bits(version):
+    """Returns the length of the byte mode character count field."""
+    return 8 if version < 10 else 16
+
+
+def capacity(version, level):
+    """Returns how many payload bytes fit in version at level."""
+    data_bits = block_layout(version, level)[0] * 8
+    return (data_bits - 4 - count_bits(version)) // 8
+
+
+def choose_version(length, level, minimum=1):
+    for version in range(minimum, 41):
+        if capacity(version, level) >= length:
+            return version
+    raise ValueError(
+        "%d bytes don't fit in a QR Code at level %s" % (length, level)
+    )
+
+
+def data_codewords(payload, version, level):
+    """Returns the data codewords of payload, with mode, character count,
+    terminator and padding, as bytes."""
+    total = block_layout(version, level)[0]
+    bits = count_bits(version)
+    length = len(payload)
+    # mode and count, then the payload, then up to 4 terminator bits, as one
+    # big int; header_bits is always 4 bits short of a whole byte
+    header_bits = 4 + bits
+    value = (MODE_BYTE << bits | length) << 8 * length
+    value |= int.from_bytes(payload, 'big')
+    used = header_bits + 8 * length
+    pad = min(4, total * 8 - used)
+    value <<= pad
+    used += pad
+    value <<= -used % 8
+    used += -used % 8
+    codewords = value.to_bytes(used // 8, 'big')
+    padding = total - len(codewords)
+    return codewords + bytes(PAD_BYTES * (padding // 2 + 1))[:padding]
+
+
+def interleave(data, version, level):
+    """Splits data codewords into blocks, adds their error correction and
+    returns all codewords in placement order."""
+    total, ecc, lengths = block_layout(version, level)
+    blocks = []
+    eccs = []
+    start = 0
+    for length in lengths:
+        block = data[start:start + length]
+        blocks.append(block)
+        eccs.append(rs_remainder(block, ecc))
+        start += length
+    out = bytearray()
+    for i in range(max(lengths)):
+        out.extend(block[i] for block in blocks if i < len(block))
+    for i in range(ecc):
+        out.extend(block[i] for block in eccs)
+    return bytes(out)
+
+
+def format_bits(level, mask):
+    """Returns the 15 format information bits of level and mask: BCH(15,5)
+    coded and XORed with 101010000010010."""
+    data = LEVELS[level] << 3 | mask
+    rem = data
+    for _ in range(10):
+        rem = (rem << 1) ^ ((rem >> 9) * 0x537)
+    return (data << 10 | rem) ^ 0x5412
+
+
+def version_bits(version):
+    """Returns the 18 version information bits, BCH(18,6) coded."""
+    rem = version
+    for _ in range(12):
+        rem = (rem << 1) ^ ((rem >> 11) * 0x1f25)
+    return version << 12 | rem
+
+
+class _Template(object):
+    """What every code of a version has in common: the function pattern
+    rows (dark and reserved modules), a getter placing data bits, and the
+    eight masks restricted to data modules."""
+    __slots__ = ('version', 'size', 'dark', 'reserved', 'data_modules',
+                 'getter', 'masks', 'mask_ints', 'formats')
+
+    def __init__(self, version):
+        self.version = version
+        size = self.size = size_of(version)
+        dark = [[False] * size for _ in range(size)]
+        reserved = [[False] * size for _ in range(size)]
+
+        def function(x, y, is_dark):
+            dark[y][x] = is_dark
+            reserved[y][x] = True
+
+        # timing patterns
+        for i in range(size):
+            function(6, i, i % 2 == 0)
+            function(i, 6, i % 2 == 0)
+        # finder patterns and separators
+        for cx, cy in ((3, 3), (size - 4, 3), (3, size - 4)):
+            for dy in range(-4, 5):
+                for dx in range(-4, 5):
+                    x, y = cx + dx, cy + dy
+                    if 0 <= x < size and 0 <= y < size:
+                        function(x, y, max(abs(dx), abs(dy)) not in (2, 4))
+        # alignment patterns
+        positions = alignment_positions(version)
+        last = len(positions) - 1
+        for i, cx in enumerate(positions):
+            for j, cy in enumerate(positions):
+                if (i, j) in ((0, 0), (0, last), (last, 0)):
+                    continue
+                for dy in range(-2, 3):
+                    for dx in range(-2, 3):
+                        function(cx + dx, cy + dy, max(abs(dx), abs(dy)) != 1)
+        # format information, filled in per level and mask
+        for i in range(9):
+            if i != 6:
+                function(8, i, False)
+                function(i, 8, False)
+        for i in range(8):
+            function(size - 1 - i, 8, False)
+            function(8, size - 1 - i, False)
+        function(8, size - 8, True)
+        # version information
+        if version >= 7:
+            bits = version_bits(version)
+            for i in range(18):
+                bit = bool((bits >> i) & 1)
+                a, b = size - 11 + i % 3, i // 3
+                function(a, b, bit)
+                function(b, a, bit)
+
+        # data modules in placement order: two columns at a time, zigzagging
+        # up and down from the right, skipping the vertical timing pattern
+        order = []
+        right = size - 1
+        while right >= 1:
+            if right == 6:
+                right = 5
+            upward = (right + 1) & 2 == 0
+            for vert in range(size):
+                y = size - 1 - vert if upward else vert
+                for x in (right, right - 1):
+                    if not reserved[y][x]:
+                        order.append((x, y))
+            right -= 2
+        self.data_modules = len(order)
+
+        # The getter picks the row-major matrix out of a string made of the
+        # data bits followed by '0' and '1' for the function modules.
+        light, on = len(order), len(order) + 1
+        sources = [[on if dark[y][x] else light for x in range(size)]
+                   for y in range(size)]
+        for i, (x, y) in enumerate(order):
+            sources[y][x] = i
+        self.getter = operator.itemgetter(*[i for row in sources for i in row])
+
+        self.reserved = [_row(r) for r in reserved]
+        self.dark = [_row(r) for r in dark]
+        free = [~r & ((1 << size) - 1) for r in self.reserved]
+        self.masks = [
+            [_row(MASKS[m](x, y) for x in range(size)) & free[y]
+             for y in range(size)]
+            for m in range(8)
+        ]
+        self.mask_ints = [matrix_ints(rows, size) for rows in self.masks]
+        self.formats = {}
+
+    def format_rows(self, level, mask):
+        """Returns the rows of the format information of level and mask."""
+        key = (level, mask)
+        cached = self.formats.get(key)
+        if cached is None:
+            size = self.size
+            bits = format_bits(level, mask)
+            modules = [[False] * size for _ in range(size)]
+            bit = lambda i: bool((bits >> i) & 1)
+            for i in range(6):
+                modules[i][8] = bit(i)
+            modules[7][8] = bit(6)
+            modules[8][8] = bit(7)
+            modules[8][7] = bit(8)
+            for i in range(9, 15):
+                modules[8][14 - i] = bit(i)
+            for i in range(8):
+                modules[8][size - 1 - i] = bit(i)
+            for i in range(8, 15):
+                modules[size - 15 + i][8] = bit(i)
+            rows = [_row(r) for r in modules]
+            cached = self.formats[key] = (rows, matrix_ints(rows, size))
+        return cached[0]
+
+    def format_ints(self, level, mask):
+        """Returns matrix_ints() of format_rows(level, mask)."""
+        self.format_rows(level, mask)
+        return self.formats[level, mask][1]
+
+
+def _row(modules):
+    """Packs booleans, first module first, into an int."""
+    value = 0
+    for m in modules:
+        value = value << 1 | bool(m)
+    return value
+
+
+MASKS = (
+    lambda x, y: (x + y) % 2 == 0,
+    lambda x, y: y % 2 == 0,
+    lambda x, y: x % 3 == 0,
+    lambda x, y: (x + y) % 3 == 0,
+    lambda x, y: (x // 3 + y // 2) % 2 == 0,
+    lambda x, y: x * y % 2 + x * y % 3 == 0,
+    lambda x, y: (x * y % 2 + x * y % 3) % 2 == 0,
+    lambda x, y: ((x + y) % 2 + x * y % 3) % 2 == 0,
+)
+
+_templates = {}
+
+
+def template(version):
+    """Returns the cached _Template of version."""
+    t = _templates.get(version)
+    if t is None:
+        t = _templates[version] = _Template(version)
+    return t
+
+
+def place(codewords, version):
+    """Returns the unmasked rows of a code made of codewords."""
+    t = template(version)
+    size = t.size
+    bits = format(int.from_bytes(codewords, 'big'), '0%db' % (8 * len(codewords)))
+    # remainder bits are light
+    bits = bits.ljust(t.data_modules, '0') + '01'
+    modules = ''.join(t.getter(bits))
+    return [int(modules[i:i + size], 2) for i in range(0, size * size, size)]
+
+
+# The penalty rules run on the whole matrix as one int, every line (a row,
+# or a column of the transposed matrix) padded with PAD light modules on
+# both sides for the quiet zone, the first line in the highest bits.  Each
+# rule is then a few shifts, ANDs and population counts over all lines at
+# once.
+PAD = 12
+
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else:
+    def _popcount(n):
+        return bin(n).count('1')
+
+
+# penalty rule 3 looks for finder-like patterns scaled up to this many times;
+# larger ones are too rare to be worth it
+FINDER_SCALES = 3
+
+_geometries = {}
+
+
+def _geometry(size):
+    """Returns (stride, pairs, above) for the padded ints of size: the
+    bits of modules whose right neighbour is a module of the same line, and
+    of modules with a line above them."""
+    geometry = _geometries.get(size)
+    if geometry is None:
+        stride = size + 2 * PAD
+        line_pairs = ((1 << (size - 1)) - 1) << PAD
+        line = ((1 << size) - 1) << PAD
+        pairs = above = 0
+        for k in range(size):
+            pairs |= line_pairs << k * stride
+            if k < size - 1:
+                above |= line << k * stride
+        geometry = _geometries[size] = (stride, pairs, above)
+    return geometry
+
+
+def _padded(lines):
+    pad = '0' * PAD
+    return int(pad + (pad + pad).join(lines) + pad, 2)
+
+
+def matrix_ints(rows, size):
+    """Returns the padded ints of the rows and of the columns of rows."""
+    fmt = '0%db' % size
+    lines = [format(r, fmt) for r in rows]
+    modules = ''.join(lines)
+    return _padded(lines), _padded([modules[x::size] for x in range(size)])
+
+
+def _score(rows, columns, size):
+    stride, pairs, above = _geometry(size)
+    score = 0
+    for m in (rows, columns):
+        # rule 1: 3 for a run of five, plus 1 for every module more; a run
+        # of n has n - 4 windows of five, the first of them where it starts
+        same = ~(m ^ (m >> 1)) & pairs
+        fives = same & (same >> 1) & (same >> 2) & (same >> 3)
+        score += _popcount(fives) + 2 * _popcount(fives & ~(same << 1))
+        # rule 3: 40 per finder-like 1:1:3:1:1 pattern, with four light
+        # modules on one side and at least one on the other; dark[k] and
+        # light[k] are where runs of k modules of a colour start
+        light_m = ~m
+        dark = [0, m]
+        light = [0, light_m]
+        for k in range(2, 4 * FINDER_SCALES + 1):
+            dark.append(dark[-1] & (m >> (k - 1)))
+            light.append(light[-1] & (light_m >> (k - 1)))
+        found = 0
+        for n in range(1, FINDER_SCALES + 1):
+            core = (dark[n] & (light[n] >> n) & (dark[3 * n] >> 2 * n) &
+                    (light[n] >> 5 * n) & (dark[n] >> 6 * n))
+            found |= light[4 * n] & (core >> 4 * n) & (light[n] >> 11 * n)
+            found |= light[n] & (core >> n) & (light[4 * n] >> 8 * n)
+        score += 40 * _popcount(found)
+
+    # rule 2: 3 per 2x2 block of one colour
+    same = ~(rows ^ (rows >> 1)) & pairs
+    vertical = ~(rows ^ (rows >> stride)) & above
+    score += 3 * _popcount(same & vertical & (vertical >> 1))
+
+    # rule 4: 10 per 5% the dark modules are off a half
+    total = size * size
+    dark = _popcount(rows)
+    score += 10 * ((abs(dark * 20 - total * 10) + total - 1) // total - 1)
+    return score
+
+
+def penalty(rows, size):
+    """Returns the ISO/IEC 18004 mask penalty score of rows."""
+    return _score(*matrix_ints(rows, size), size=size)
+
+
+def apply_mask(rows, version, level, mask):
+    t = template(version)
+    return [r ^ m | f for r, m, f in
+            zip(rows, t.masks[mask], t.format_rows(level, mask))]
+
+
+class Code(object):
+    """An encoded QR Code: its version, level, mask, the mask's penalty
+    score (None if it wasn't evaluated) and its rows of modules as ints."""
+    __slots__ = ('version', 'level', 'mask', 'penalty', 'rows')
+
+    def __init__(self, version, level, mask, penalty, rows):
+        self.version = version
+        self.level = level
+        self.mask = mask
+        self.penalty = penalty
+        self.rows = rows
+
+    @property
+    def size(self):
+        return size_of(self.version)
+
+    def score(self):
+        """Returns the mask penalty score, computing it if need be."""
+        if self.penalty is None:
+            self.penalty = penalty(self.rows, self.size)
+        return self.penalty
+
+    def matrix(self):
+        """Returns the modules as a list of rows of booleans, True for dark
+        modules, without the quiet zone."""
+        fmt = '0%db' % self.size
+        return [[c == '1' for c in format(r, fmt)] for r in self.rows]
+
+    def __repr__(self):
+        return 'Code(version=%d, level=%r, mask=%d, penalty=%r)' % (
+            self.version, self.level, self.mask, self.penalty
+        )
+
+
+# the masks tried with mask='fast': over random payloads the better of these
+# two scores about 2% above the best of all eight, at a quarter of the cost
+FAST_MASKS = (2, 3)
+
+
+def masks_of(mask):
+    """Returns the mask numbers to try for mask: None for all eight, 'fast'
+    for FAST_MASKS, a mask number or a sequence of them."""
+    if mask is None:
+        return tuple(range(8))
+    if mask == 'fast':
+        return FAST_MASKS
+    if isinstance(mask, int):
+        mask = (mask,)
+    mask = tuple(mask)
+    if not mask or any(m not in range(8) for m in mask):
+        raise ValueError("masks are numbered 0 to 7, not %r" % (mask,))
+    return mask
+
+
+def finish(rows, version, level, mask=None):
+    """Masks unmasked rows and returns the Code. mask is anything masks_of()
+    takes; of several masks the one with the lowest penalty is used.  A
+    single mask is not scored, so the Code's penalty is None."""
+    masks = masks_of(mask)
+    if len(masks) == 1:
+        m = masks[0]
+        return Code(version, level, m, None, apply_mask(rows, version, level, m))
+    t = template(version)
+    unmasked, unmasked_columns = matrix_ints(rows, t.size)
+    best = None
+    for m in masks:
+        mask_rows, mask_columns = t.mask_ints[m]
+        format_rows, format_columns = t.format_ints(level, m)
+        score = _score(unmasked ^ mask_rows | format_rows,
+                       unmasked_columns ^ mask_columns | format_columns,
+                       t.size)
+        if best is None or score < best[0]:
+            best = (score, m)
+    score, m = best
+    return Code(version, level, m, score, apply_mask(rows, version, level, m))
+
+
+def _nibble_table(bases):
+    """Returns the XOR of the bases picked by the bits of every nibble, the
+    first base going with the highest bit."""
+    table = [0] * 16
+    for v in range(1, 16):
+        low = v & -v
+        table[v] = table[v ^ low] ^ bases[4 - low.bit_length()]
+    return table
+
+
+class SuffixTemplate(object):
+    """Encodes payloads made of a fixed prefix and a suffix of suffix_length
+    bytes, such as serial numbers, all in the same version.
+
+    Everything from the data codewords to the masked modules is linear over
+    XOR (Reed-Solomon codes too), so the code of prefix + suffix is the code
+    of the prefix followed by zero bytes, XORed with what every bit of the
+    suffix contributes on its own.  Those contributions are worked out once
+    and tabled per byte and nibble, with the whole matrix as one int, so a
+    suffix costs two XORs per byte.  With a single mask the mask and format
+    information are part of the template; otherwise finish() still scores
+    the masks of every code."""
+
+    def __init__(self, prefix, suffix_length, level='L', version=None, mask=None):
+        if level not in LEVELS:
+            raise ValueError("level should be one of L, M, Q or H, not %r" % (level,))
+        self.prefix = prefix
+        self.suffix_length = suffix_length
+        self.level = level
+        self.version = version = choose_version(
+            len(prefix) + suffix_length, level, version or 1
+        )
+        masks = masks_of(mask)
+        self.fixed = len(masks) == 1
+        self.mask = masks[0] if self.fixed else mask
+        size = self.size = size_of(version)
+        self.shifts = [size * (size - 1 - y) for y in range(size)]
+
+        def value(suffix):
+            data = data_codewords(prefix + bytes(suffix), version, level)
+            rows = place(interleave(data, version, level), version)
+            if self.fixed:
+                rows = apply_mask(rows, version, level, self.mask)
+            result = 0
+            for r in rows:
+                result = result << size | r
+            return result
+
+        self.base = value(bytes(suffix_length))
+        self.tables = []
+        for i in range(suffix_length):
+            bases = []
+            for bit in range(8):
+                suffix = bytearray(suffix_length)
+                suffix[i] = 0x80 >> bit
+                bases.append(value(suffix) ^ self.base)
+            self.tables.append((_nibble_table(bases[:4]), _nibble_table(bases[4:])))
+
+    def make(self, suffix):
+        """Returns the Code of the prefix followed by the suffix bytes."""
+        if len(suffix) != self.suffix_length:
+            raise ValueError("suffix should be %d bytes long, not %d" % (
+                self.suffix_length, len(suffix)
+            ))
+        value = self.base
+        for (high, low), b in zip(self.tables, suffix):
+            value ^= high[b >> 4] ^ low[b & 15]
+        full = (1 << self.size) - 1
+        rows = [value >> shift & full for shift in self.shifts]
+        if self.fixed:
+            return Code(self.version, self.level, self.mask, None, rows)
+        return finish(rows, self.version, self.level, self.mask)
+
+
+def make(payload, level='L', version=None, mask=None):
+    """Encodes the payload bytes as a Code at error correction level, in
+    the smallest version they fit in (at least version, if given), with
+    mask chosen as finish() does."""
+    if level not in LEVELS:
+        raise ValueError("level should be one of L, M, Q or H, not %r" % (level,))
+    version = choose_version(len(payload), level, version or 1)
+    codewords = interleave(data_codewords(payload, version, level), version, level)
+    return finish(place(codewords, version), version, level, mask)
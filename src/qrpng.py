@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+# qrpng.py: Compact PNG writer for QR Code module matrices.
+#
+# `qrpng.py` is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# `qrpng.py` is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along
+# with `qrpng.py`.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import struct
+import time
+import zlib
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# PNG scanline filter types.
+FILTER_NONE = b'\x00'
+FILTER_UP = b'\x02'
+
+# compression presets: name -> (zlib level, zlib strategy)
+# Z_RLE only looks for runs of repeated bytes, which are most of a QR Code
+# bitmap, so it is much cheaper than a full match search for a modest loss.
+COMPRESSION = {
+    'fast': (1, getattr(zlib, 'Z_RLE', 3)),
+    'default': (6, zlib.Z_DEFAULT_STRATEGY),
+    'small': (9, zlib.Z_DEFAULT_STRATEGY),
+}
+
+
+def _compressor(compression):
+    if compression in COMPRESSION:
+        level, strategy = COMPRESSION[compression]
+    elif isinstance(compression, int) and 0 <= compression <= 9:
+        level, strategy = compression, zlib.Z_DEFAULT_STRATEGY
+    else:
+        raise ValueError(
+            "compression should be one of %s or a zlib level (0-9), not %r"
+            % (", ".join(sorted(COMPRESSION)), compression)
+        )
+    return zlib.compressobj(level, zlib.DEFLATED, 15, 9, strategy)
+
+
+def _chunk(kind, data):
+    return b''.join([
+        struct.pack('>I', len(data)),
+        kind,
+        data,
+        struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff),
+    ])
+
+
+_spread_tables = {}
+
+
+def _spread_table(pixel_size):
+    """Returns, for every byte of 8 modules, its pixel_size bytes of pixels:
+    each bit repeated pixel_size times."""
+    table = _spread_tables.get(pixel_size)
+    if table is None:
+        ones = (1 << pixel_size) - 1
+        table = _spread_tables[pixel_size] = []
+        for b in range(256):
+            bits = 0
+            for i in range(7, -1, -1):
+                bits = bits << pixel_size | (ones if b >> i & 1 else 0)
+            table.append(bits.to_bytes(pixel_size, 'big'))
+    return table
+
+
+def _row_int(modules):
+    """Returns a row of booleans as an int, the first module in the highest
+    bit, as qrencoder keeps its rows."""
+    value = 0
+    for m in modules:
+        value = value << 1 | bool(m)
+    return value
+
+
+def _scanlines(rows, size, pixel_size, margin_size):
+    """Packs rows of size modules, ints whose highest bit is the first
+    module, into 1-bit pixels with the quiet zone on each side; 0 is black,
+    1 is white.  Returns a list of bytes, one per row."""
+    table = _spread_table(pixel_size)
+    # modules are spread a byte at a time, so rows are padded to whole bytes
+    pad = -size % 8
+    row_bytes = (size + pad) // 8
+    width = (size + 2 * margin_size) * pixel_size
+    line_bytes = (width + 7) // 8
+    # scanlines too are padded to whole bytes, at their end
+    end = -width % 8
+    light = ((1 << width) - 1) << end
+    shift = (margin_size - pad) * pixel_size + end
+    lines = []
+    for row in rows:
+        modules = (row << pad).to_bytes(row_bytes, 'big')
+        dark = int.from_bytes(b''.join([table[b] for b in modules]), 'big')
+        dark = dark << shift if shift >= 0 else dark >> -shift
+        lines.append((light ^ dark).to_bytes(line_bytes, 'big'))
+    return lines
+
+
+def png_bytes(matrix, pixel_size=3, margin_size=4, compression='default'):
+    """Returns a 1-bit grayscale PNG of the QR Code's module matrix.
+
+    matrix is a list of rows without the quiet zone, each a sequence of
+    booleans (True for dark modules) or, quicker, an int whose highest of
+    len(matrix) bits is the first module, like qrencoder.Code.rows;
+    margin_size modules of quiet zone are added around it and every module
+    is drawn as pixel_size x pixel_size pixels.
+
+    Since every module row repeats pixel_size times, only the first scanline
+    of each one is stored as is; the others use the "Up" filter, which turns
+    them into runs of zeros.  compression is one of 'fast', 'default' or
+    'small', or a zlib level.
+    """
+    pixel_size = int(pixel_size)
+    margin_size = int(margin_size)
+    size = len(matrix)
+    side = (size + 2 * margin_size) * pixel_size
+    compressor = _compressor(compression)
+
+    rows = [r if isinstance(r, int) else _row_int(r) for r in matrix]
+    rows = [0] * margin_size + rows + [0] * margin_size
+    # rows repeat (the quiet zone and timing patterns at least), so every
+    # distinct one is packed once
+    distinct = list(set(rows))
+    lines = _scanlines(distinct, size, pixel_size, margin_size)
+    up = FILTER_UP + b'\x00' * len(lines[0]) if lines else b''
+    packed = dict(
+        (row, FILTER_NONE + line + up * (pixel_size - 1))
+        for row, line in zip(distinct, lines)
+    )
+    image = b''.join([packed[row] for row in rows])
+    data = compressor.compress(image) + compressor.flush()
+
+    return b''.join([
+        PNG_SIGNATURE,
+        _chunk(b'IHDR', struct.pack('>IIBBBBB', side, side, 1, 0, 0, 0, 0)),
+        _chunk(b'IDAT', data),
+        _chunk(b'IEND', b''),
+    ])
+
+
+def write_png(matrix, target, pixel_size=3, margin_size=4, compression='default'):
+    """Writes png_bytes() to target, a filename or a binary file object."""
+    data = png_bytes(matrix, pixel_size, margin_size, compression)
+    if hasattr(target, 'write'):
+        target.write(data)
+    else:
+        with open(target, 'wb') as f:
+            f.write(data)
+
+
+def write_archive(items, target, format='tar', pixel_size=3, margin_size=4,
+                  compression='default'):
+    """Writes a PNG for each (name, matrix) pair of items into an archive;
+    matrix is as for png_bytes(), or the bytes of a PNG made beforehand,
+    e.g. by another process.
+
+    target is a filename or a binary file object and format is 'tar' or
+    'zip'.  Items are consumed one at a time and the tar stream never seeks,
+    so items may be a generator and target a pipe or a socket.  Returns the
+    number of images written.
+    """
+    if format == 'tar':
+        import tarfile
+        if hasattr(target, 'write'):
+            archive = tarfile.open(fileobj=target, mode='w|')
+        else:
+            archive = tarfile.open(target, mode='w|')
+
+        def add(name, data):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = time.time()
+            archive.addfile(info, io.BytesIO(data))
+    elif format == 'zip':
+        import zipfile
+        # PNG data is already deflated; storing it is faster and no bigger.
+        archive = zipfile.ZipFile(target, 'w', zipfile.ZIP_STORED)
+
+        def add(name, data):
+            archive.writestr(name, data)
+    else:
+        raise ValueError("format should be 'tar' or 'zip', not %r" % (format,))
+
+    count = 0
+    try:
+        for name, matrix in items:
+            if not name.endswith('.png'):
+                name += '.png'
+            if isinstance(matrix, bytes):
+                add(name, matrix)
+            else:
+                add(name, png_bytes(matrix, pixel_size, margin_size, compression))
+            count += 1
+    finally:
+        archive.close()
+    return count
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+# qrsandbox.py: Running decoders in a worker process with time and memory limits.
+#
+# `qrsandbox.py` is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# `qrsandbox.py` is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along
+# with `qrsandbox.py`.  If not, see <http://www.gnu.org/licenses/>.
+
+import multiprocessing
+import threading
+
+
+class Timeout(Exception):
+    """Raised by Sandbox.run() when the call didn't finish in time."""
+
+
+def _serve(conn, max_memory):
+    if max_memory is not None:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+    while True:
+        try:
+            function, args = conn.recv()
+        except EOFError:
+            # the parent went away
+            return
+        try:
+            result = (True, function(*args))
+        except Exception as e:
+            result = (False, e)
+        conn.send(result)
+
+
+class Sandbox(object):
+    """A worker process calling functions for one thread at a time, with
+    its address space limited to max_memory bytes (None for no limit).
+    The limit covers what the worker inherits when it is forked, so it
+    must leave room above the parent's virtual size.
+
+    A call that runs out of time has its worker killed; the next call
+    starts a new one."""
+
+    def __init__(self, max_memory=None):
+        if max_memory is not None:
+            try:
+                import resource
+            except ImportError:
+                raise ValueError("memory limits aren't supported on this platform")
+        self.max_memory = max_memory
+        self.process = None
+        self.conn = None
+
+    def _start(self):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_serve, args=(child, self.max_memory)
+        )
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+
+    def run(self, function, args, timeout=None):
+        """Returns function(*args) called in the worker, re-raising what it
+        raises.  Raises Timeout after timeout seconds (None to wait for
+        ever), or RuntimeError if the worker died, e.g. crashed in zbar."""
+        if self.process is None or not self.process.is_alive():
+            self._start()
+        try:
+            self.conn.send((function, args))
+            if not self.conn.poll(timeout):
+                self.close()
+                raise Timeout(timeout)
+            ok, result = self.conn.recv()
+        except (EOFError, OSError):
+            self.process.join(1)
+            code = self.process.exitcode
+            self.close()
+            raise RuntimeError("decoder process exited with status %r" % (code,))
+        if not ok:
+            raise result
+        return result
+
+    def close(self):
+        """Kills the worker, if any."""
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+            self.conn.close()
+            self.process = self.conn = None
+
+
+_local = threading.local()
+
+
+def sandbox(max_memory=None):
+    """Returns the calling thread's Sandbox for max_memory, so that threads
+    don't wait for each other's calls."""
+    sandboxes = getattr(_local, 'sandboxes', None)
+    if sandboxes is None:
+        sandboxes = _local.sandboxes = {}
+    box = sandboxes.get(max_memory)
+    if box is None:
+        box = sandboxes[max_memory] = Sandbox(max_memory)
+    return box
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+# qrshm.py: Decoding frames handed over through a shared memory ring buffer.
+#
+# `qrshm.py` is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# `qrshm.py` is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along
+# with `qrshm.py`.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A FrameRing is a block of shared memory split into slots, each holding one
+Y800 frame and room for the data decoded from it.  One process (the
+producer) puts frames in and collects results; decode workers, each owning
+the slots whose number modulo the number of workers is its own, scan the
+frames straight from shared memory, copying each into bytes once because
+the zbar bindings take nothing else.
+
+Every slot has a state byte, and each change of state is made by one side
+only: the producer turns FREE and DONE slots into READY ones, the slot's
+worker turns READY ones into DONE ones.  So no slot has more than one
+writer at a time and nothing needs a lock.  The state byte is written after
+the rest of the slot, which is enough on x86, whose stores are seen in the
+order they were made.  Python has no memory barriers, so on weakly ordered
+CPUs such as ARM a worker could see the state byte first: the producer
+therefore writes the frame's sequence number both in the slot header and
+after the pixels, and a worker leaves a slot alone until the two match and
+are new.  That makes a torn frame unlikely there rather than impossible;
+for hard guarantees, keep the ring to x86.
+
+A worker whose decoder raises sets the slot's error flag and puts the
+message in place of the result.
+"""
+
+import struct
+import time
+
+FREE, READY, DONE = 0, 1, 2
+
+# slots, max width, max height, result size, stop flag
+RING_HEADER = struct.Struct('<IIIIB')
+RING_HEADER_SIZE = 64
+# state, error flag, width, height, result length, sequence number, timestamp
+SLOT_HEADER = struct.Struct('<BBxxIIIQd')
+# the sequence number again, after the pixels
+SLOT_TRAILER = struct.Struct('<Q')
+# number of symbols, then the length and UTF-8 data of each
+RESULT_COUNT = struct.Struct('<H')
+RESULT_LENGTH = struct.Struct('<I')
+
+
+def _shared_memory(name=None, size=0):
+    from multiprocessing import shared_memory
+    if name is None:
+        return shared_memory.SharedMemory(create=True, size=size)
+    try:
+        # only the process that made the ring should unlink it
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name)
+
+
+def pack_result(data, size):
+    """Packs a tuple of str into at most size bytes, leaving out the
+    symbols that don't fit."""
+    parts = []
+    used = RESULT_COUNT.size
+    for d in data:
+        d = d.encode('utf-8')
+        if used + RESULT_LENGTH.size + len(d) > size:
+            break
+        parts.append(RESULT_LENGTH.pack(len(d)) + d)
+        used += RESULT_LENGTH.size + len(d)
+    return RESULT_COUNT.pack(len(parts)) + b''.join(parts)
+
+
+def unpack_result(buf):
+    """Returns the tuple of str pack_result() packed into buf."""
+    count, = RESULT_COUNT.unpack_from(buf, 0)
+    offset = RESULT_COUNT.size
+    data = []
+    for _ in range(count):
+        length, = RESULT_LENGTH.unpack_from(buf, offset)
+        offset += RESULT_LENGTH.size
+        data.append(bytes(buf[offset:offset + length]).decode('utf-8'))
+        offset += length
+    return tuple(data)
+
+
+class FrameRing(object):
+    """A ring of slots frames of up to max_width x max_height pixels in
+    shared memory, with result_size bytes for the decoded data of each.
+
+    With name=None a new ring is made, whose name attach() takes in other
+    processes; otherwise the existing ring name is attached to."""
+
+    def __init__(self, name=None, slots=16, max_width=1920, max_height=1080,
+                 result_size=4096):
+        if name is None:
+            size = RING_HEADER_SIZE + slots * (
+                SLOT_HEADER.size + result_size + max_width * max_height +
+                SLOT_TRAILER.size
+            )
+            self.shm = _shared_memory(None, size)
+            RING_HEADER.pack_into(
+                self.shm.buf, 0, slots, max_width, max_height, result_size, 0
+            )
+            self.owner = True
+        else:
+            self.shm = _shared_memory(name)
+            slots, max_width, max_height, result_size, _ = \
+                RING_HEADER.unpack_from(self.shm.buf, 0)
+            self.owner = False
+        self.name = self.shm.name
+        self.slots = slots
+        self.max_width = max_width
+        self.max_height = max_height
+        self.result_size = result_size
+        self.slot_size = (SLOT_HEADER.size + result_size +
+                          max_width * max_height + SLOT_TRAILER.size)
+        self.buf = self.shm.buf
+        # producer side
+        self.cursor = 0
+        self.sequence = 0
+        self.dropped = 0
+        self.collected = []
+        self.workers = []
+
+    @classmethod
+    def attach(cls, name):
+        return cls(name)
+
+    def offset(self, slot):
+        return RING_HEADER_SIZE + slot * self.slot_size
+
+    def trailer(self, slot):
+        """Returns the offset of slot's copy of the sequence number."""
+        return self.offset(slot + 1) - SLOT_TRAILER.size
+
+    def state(self, slot):
+        return self.buf[self.offset(slot)]
+
+    @property
+    def stopped(self):
+        return bool(self.buf[RING_HEADER.size - 1])
+
+    def _collect(self, slot):
+        offset = self.offset(slot)
+        _, error, width, height, length, sequence, timestamp = \
+            SLOT_HEADER.unpack_from(self.buf, offset)
+        start = offset + SLOT_HEADER.size
+        result = bytes(self.buf[start:start + length])
+        if error:
+            data, error = (), result.decode('utf-8', 'replace')
+        else:
+            data, error = unpack_result(result), None
+        self.collected.append((sequence, timestamp, data, error))
+        self.buf[offset] = FREE
+
+    def put(self, pixels, width, height, timestamp=None):
+        """Copies a Y800 frame (any C-contiguous buffer of width x height
+        bytes) into a free slot and returns its sequence number, or None if
+        every slot is still being decoded, in which case the frame is
+        dropped."""
+        if width > self.max_width or height > self.max_height:
+            raise ValueError("%dx%d frame is larger than the ring's %dx%d" % (
+                width, height, self.max_width, self.max_height
+            ))
+        for _ in range(self.slots):
+            slot = self.cursor
+            self.cursor = (self.cursor + 1) % self.slots
+            state = self.state(slot)
+            if state == READY:
+                continue
+            if state == DONE:
+                self._collect(slot)
+            offset = self.offset(slot)
+            start = offset + SLOT_HEADER.size + self.result_size
+            size = width * height
+            view = memoryview(pixels).cast('B')
+            try:
+                self.buf[start:start + size] = view[:size]
+            finally:
+                view.release()
+            self.sequence += 1
+            SLOT_HEADER.pack_into(
+                self.buf, offset, FREE, 0, width, height, 0, self.sequence,
+                time.time() if timestamp is None else timestamp
+            )
+            SLOT_TRAILER.pack_into(self.buf, self.trailer(slot), self.sequence)
+            # publish the frame only once it is all there
+            self.buf[offset] = READY
+            return self.sequence
+        self.dropped += 1
+        return None
+
+    def results(self):
+        """Returns the (sequence number, timestamp, tuple of data, error) of
+        every frame decoded since the last call, oldest first.  error is
+        None, or the message of the exception decoding the frame raised."""
+        for slot in range(self.slots):
+            if self.state(slot) == DONE:
+                self._collect(slot)
+        collected = sorted(self.collected)
+        self.collected = []
+        return collected
+
+    def start(self, processes=None):
+        """Starts processes decode workers (one per CPU if None)."""
+        import multiprocessing
+        processes = processes or multiprocessing.cpu_count()
+        for index in range(processes):
+            process = multiprocessing.Process(
+                target=serve, args=(self.name, index, processes)
+            )
+            process.daemon = True
+            process.start()
+            self.workers.append(process)
+
+    def stop(self):
+        """Tells the workers to stop and waits for them."""
+        self.buf[RING_HEADER.size - 1] = 1
+        for process in self.workers:
+            process.join()
+        self.workers = []
+
+    def close(self):
+        """Stops the workers, detaches from the ring and, in the process
+        that made it, frees it."""
+        if self.workers:
+            self.stop()
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def serve(name, index, workers, poll_interval=0.0005):
+    """Decodes the frames of the ring name in the slots worker index of
+    workers owns, until the ring is stopped."""
+    if __package__:
+        from .qrtools import decode_y800
+    else:
+        from qrtools import decode_y800
+    ring = FrameRing.attach(name)
+    buf = ring.buf
+    owned = range(index, ring.slots, workers)
+    # the sequence number of the last frame decoded in each slot
+    decoded = dict((slot, 0) for slot in owned)
+    try:
+        while not ring.stopped:
+            idle = True
+            for slot in owned:
+                offset = ring.offset(slot)
+                if buf[offset] != READY:
+                    continue
+                idle = False
+                _, _, width, height, _, sequence, timestamp = \
+                    SLOT_HEADER.unpack_from(buf, offset)
+                trailer, = SLOT_TRAILER.unpack_from(buf, ring.trailer(slot))
+                if sequence != trailer or sequence <= decoded[slot]:
+                    # the rest of the slot isn't visible yet
+                    continue
+                start = offset + SLOT_HEADER.size
+                pixels = buf[start + ring.result_size:
+                             start + ring.result_size + width * height]
+                try:
+                    # the one copy of the frame: zbar only takes bytes
+                    frame = bytes(pixels)
+                finally:
+                    pixels.release()
+                error = 0
+                try:
+                    data = tuple(s.data for s in decode_y800(frame, width, height))
+                    result = pack_result(data, ring.result_size)
+                except Exception as e:
+                    error = 1
+                    message = '%s: %s' % (e.__class__.__name__, e)
+                    result = message.encode('utf-8')[:ring.result_size]
+                buf[start:start + len(result)] = result
+                SLOT_HEADER.pack_into(
+                    buf, offset, READY, error, width, height, len(result),
+                    sequence, timestamp
+                )
+                decoded[slot] = sequence
+                buf[offset] = DONE
+            if idle:
+                time.sleep(poll_interval)
+    finally:
+        del buf
+        ring.close()
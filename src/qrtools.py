@@ -1,4 +1,4 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python3
 
 # Authors:
 #   David Green <david4dev@gmail.com>
@@ -20,29 +20,69 @@
 # You should have received a copy of the GNU General Public License along
 # with `qrtools.py`.  If not, see <http://www.gnu.org/licenses/>.
 
-import subprocess
+# Only what every QR needs is imported here. The decoding backends (zbar,
+# PIL), subprocess and the other qrtools modules are imported the first
+# time they are used, so that encode-only code doesn't pay for the decoder
+# and works where it isn't installed, and vice versa.
+import importlib
 import os
-import time
-import shutil
-import hashlib
-import zbar
-try:
-    from PIL import Image
-except:
-    import Image
-import re
 from codecs import BOM_UTF8
 
+__all__ = [
+    'QR', 'EncodeOptions', 'EncodeResult', 'Symbol', 'EncodeError',
+    'DecodeTimeout', 'ImageTooLarge',
+    'encode', 'encode_series', 'decode', 'decode_y800',
+]
+
+# 'qrtools' when installed as a package, '' when src/ is on the path
+_PACKAGE = __name__.rpartition('.')[0]
+
+
+def _load(name):
+    """Returns the qrtools module name, importing it on first use."""
+    return importlib.import_module(_PACKAGE + '.' + name if _PACKAGE else name)
+
+
+class _LazyModule(object):
+    """Stands for a module that is imported when first used."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+
+# only some data types need regular expressions
+re = _LazyModule('re')
+
+
+def _text(data):
+    """Returns symbol data as str; depending on their version, the zbar
+    bindings give either bytes or text."""
+    if isinstance(data, bytes):
+        # Assuming data is encoded in utf8
+        return data.decode('utf-8')
+    return data
+
+
+def _pil_image():
+    try:
+        from PIL import Image
+    except ImportError:
+        import Image
+    return Image
+
 
 class QR(object):
 
     def encode_url(data):
         data_lower = data.lower()
-        if data_lower.startswith(u"http://"):
+        if data_lower.startswith("http://"):
             return ('http://' + re.compile(
                 r'^http://', re.IGNORECASE
             ).sub('', data))
-#        elif data_lower.startswith(u"https://"):
+#        elif data_lower.startswith("https://"):
         # Use https as standard.
         else:
             return ('https://' + re.compile(
@@ -50,7 +90,7 @@ class QR(object):
             ).sub('', data))
 
     # use these for custom data formats eg. url, phone number, VCARD
-    # data should be an unicode object or a list of unicode objects
+    # data should be a str or a list of str
     data_encode = {
         'text': lambda data: data,
         'url': encode_url,
@@ -73,132 +113,139 @@ class QR(object):
     data_decode = {
         'text': lambda data: data,
         'url': lambda data: data,
-        'email': lambda data: data.replace(u"mailto:", u"").replace(u"MAILTO:", u""),
-        'emailmessage': lambda data: re.findall(u"MATMSG:TO:(.*);SUB:(.*);BODY:(.*);;", data, re.IGNORECASE)[0],
-        'telephone': lambda data: data.replace(u"tel:", u"").replace(u"TEL:", u""),
-        'sms': lambda data: re.findall(u"SMSTO:(.*):(.*)", data, re.IGNORECASE)[0],
-        'mms': lambda data: re.findall(u"MMSTO:(.*):(.*)", data, re.IGNORECASE)[0],
-        'geo': lambda data: re.findall(u"GEO:(.*),(.*)", data, re.IGNORECASE)[0],
-        'bookmark': lambda data: re.findall(u"MEBKM:TITLE:(.*);URL:(.*);;", data, re.IGNORECASE)[0],
+        'email': lambda data: data.replace("mailto:", "").replace("MAILTO:", ""),
+        'emailmessage': lambda data: re.findall("MATMSG:TO:(.*);SUB:(.*);BODY:(.*);;", data, re.IGNORECASE)[0],
+        'telephone': lambda data: data.replace("tel:", "").replace("TEL:", ""),
+        'sms': lambda data: re.findall("SMSTO:(.*):(.*)", data, re.IGNORECASE)[0],
+        'mms': lambda data: re.findall("MMSTO:(.*):(.*)", data, re.IGNORECASE)[0],
+        'geo': lambda data: re.findall("GEO:(.*),(.*)", data, re.IGNORECASE)[0],
+        'bookmark': lambda data: re.findall("MEBKM:TITLE:(.*);URL:(.*);;", data, re.IGNORECASE)[0],
         'phonebook': lambda data: dict(re.findall("(.*?):(.*?);", data.replace("MECARD:", ""), re.IGNORECASE))
     }
 
     def data_recognise(self, data=None):
-        """Returns an unicode string indicating the data type of the data paramater"""
-        data = data or self.data
-        data_lower = data.lower()
-        if data_lower.startswith(u"http://") or data_lower.startswith(u"https://"):
-            return u'url'
-        elif data_lower.startswith(u"mailto:"):
-            return u'email'
-        elif data_lower.startswith(u"matmsg:to:"):
-            return u'emailmessage'
-        elif data_lower.startswith(u"tel:"):
-            return u'telephone'
-        elif data_lower.startswith(u"smsto:"):
-            return u'sms'
-        elif data_lower.startswith(u"mmsto:"):
-            return u'mms'
-        elif data_lower.startswith(u"geo:"):
-            return u'geo'
-        elif data_lower.startswith(u"mebkm:title:"):
-            return u'bookmark'
-        elif data_lower.startswith(u"mecard:"):
-            return u'phonebook'
-        else:
-            return u'text'
+        """Returns a str indicating the data type of the data paramater"""
+        return data_recognise(data or self.data)
 
     def __init__(
-        self, data=u'NULL', pixel_size=3, level='L', margin_size=4,
-        data_type=u'text', filename=None
+        self, data='NULL', pixel_size=3, level='L', margin_size=4,
+        data_type='text', filename=None, encoder='qrencode', mask=None,
+        score=False
     ):
         self.pixel_size = pixel_size
         self.level = level
         self.margin_size = margin_size
         self.data_type = data_type
-        # you should pass data as a unicode object or a list/tuple of unicode
-        # objects.
+        self.encoder = encoder
+        self.mask = mask
+        self.score = score
+        # the mask penalty score of the last native encode(), if it was scored
+        self.penalty = None
+        # you should pass data as a str or a list/tuple of str.
         self.data = data
-        # get a temp directory
-        self.directory = os.path.join('/tmp', 'qr-%f' % time.time())
+        # the temp directory is only made if get_tmp_file() needs it
+        self._directory = None
         self.filename = filename
-        os.makedirs(self.directory)
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            import tempfile
+            self._directory = tempfile.mkdtemp(prefix='qr-')
+        return self._directory
+
+    def options(self, **changes):
+        """Returns the QR's settings as EncodeOptions."""
+        options = EncodeOptions(
+            self.pixel_size, self.level, self.margin_size, self.data_type,
+            encoder=self.encoder, mask=self.mask, score=self.score
+        )
+        return options.replace(**changes) if changes else options
 
     def data_to_string(self):
-        """Returns a UTF8 string with the QR Code's data"""
-        # FIX-ME: if we don't add the BOM_UTF8 char, QtQR doesn't decode
-        # correctly; but if we add it, mobile apps don't.-
-        # Apparently is a zbar bug.
-        if self.data_type == 'text':
-            return BOM_UTF8 + self.__class__.data_encode[self.data_type](self.data).encode('utf-8')
-        else:
-            return self.__class__.data_encode[self.data_type](self.data).encode('utf-8')
+        """Returns the QR Code's data as UTF-8 encoded bytes"""
+        return encode_payload(self.data, self.data_type)
 
-    def get_tmp_file(self):
-        if type(self.data) is tuple and type(self.data[0]) is tuple:
-            return os.path.join(
-                self.directory,
-                hashlib.sha256(self.data[0][0]).hexdigest() + '.png'
-            )
-        elif type(self.data) is tuple:
-            return os.path.join(
-                self.directory,
-                hashlib.sha256(self.data[0]).hexdigest() + '.png'
-            )
-        else:
+    def get_tmp_file(self, payload=None):
+        """Returns a file name in the temp directory made of the hash of the
+        encoded data, which payload may give if it's already at hand."""
+        import hashlib
+        if payload is None:
+            payload = self.data_to_string()
+        return os.path.join(
+            self.directory,
+            # filename is hash of data
+            hashlib.sha256(payload).hexdigest() + '.png'
+        )
 
-            return os.path.join(
-                self.directory,
-                # filename is hash of data
-                hashlib.sha256(self.data_to_string()).hexdigest() + '.png'
-            )
+    def get_matrix(self, payload=None):
+        """Returns the QR Code's modules as a list of rows of booleans (True
+        for dark modules), without the quiet zone; or None if the data
+        could not be encoded."""
+        if payload is None:
+            payload = self.data_to_string()
+        try:
+            options = self.options()
+            if options.encoder == 'native':
+                return native_code(payload, options).matrix()
+            return qrencode_matrix(payload, options.level)
+        except (EncodeError, ValueError):
+            return None
 
-    def encode(self, filename=None):
-        self.filename = filename or self.get_tmp_file()
+    def encode(self, filename=None, compression=None):
+        """Writes the QR Code as a PNG image and returns 0 on success.
+
+        By default the image is written by qrencode itself. If compression
+        is given ('fast', 'default', 'small' or a zlib level), or the QR's
+        encoder is 'native', the modules are written as a 1-bit grayscale
+        PNG by qrpng instead.  Returns -1 if the data doesn't fit in a QR
+        Code with the native encoder."""
+        payload = self.data_to_string()
+        self.filename = filename or self.get_tmp_file(payload)
         if not self.filename.endswith('.png'):
             self.filename += '.png'
-        return subprocess.Popen([
-            'qrencode',
-            '-o', self.filename,
-            '-s', unicode(self.pixel_size),
-            '-m', unicode(self.margin_size),
-            '-l', self.level,
-            self.data_to_string()
-        ]).wait()
-
-    def decode(self, filename=None):
+        try:
+            result = encode(
+                payload, self.options(compression=compression), self.filename
+            )
+            self.penalty = result.penalty
+        except EncodeError as e:
+            return e.returncode
+        except ValueError:
+            return -1
+        return 0
+
+    def decode(self, filename=None, cache=None, max_pixels=None, timeout=None,
+               max_memory=None):
+        """Decodes the QR Code in the image file filename and returns True if
+        one was found.
+
+        cache is an optional qrcache.MemoryCache or qrcache.SQLiteCache;
+        images already seen there, found or not, are not scanned again.
+        max_pixels, timeout and max_memory bound the work, as for decode();
+        a decode that runs out of time returns False."""
         self.filename = filename or self.filename
-        if self.filename:
-            scanner = zbar.ImageScanner()
-            # configure the reader
-            scanner.parse_config('enable')
-            # obtain image data
-            pil = Image.open(self.filename).convert('L')
-            width, height = pil.size
-            try:
-                raw = pil.tobytes()
-            except AttributeError:
-                raw = pil.tostring()
-            # wrap image data
-            image = zbar.Image(width, height, 'Y800', raw)
-            # scan the image for barcodes
-            result = scanner.scan(image)
-            # extract results
-            if result == 0:
-                return False
-            else:
-                for symbol in image:
-                    pass
-                # clean up
-                del(image)
-                # Assuming data is encoded in utf8
-                self.data = symbol.data.decode(u'utf-8')
-                self.data_type = self.data_recognise()
-                return True
-        else:
+        if not self.filename:
             return False
+        return self._set_result(decode(
+            self.filename, cache, max_pixels, timeout, max_memory
+        ))
+
+    def decode_y800(self, raw, width, height, cache=None):
+        """Decodes a QR Code from 8-bit grayscale (Y800) pixels and returns
+        True if one was found; see decode_y800()."""
+        return self._set_result(decode_y800(raw, width, height, cache))
+
+    def _set_result(self, symbols):
+        if not symbols:
+            return False
+        # like zbar, the last symbol found wins
+        self.data = symbols[-1].data
+        self.data_type = symbols[-1].data_type
+        return True
 
     def decode_webcam(self, callback=lambda s: None, device='/dev/video0'):
+        import zbar
         # create a Processor
         proc = zbar.Processor()
 
@@ -213,9 +260,9 @@ class QR(object):
             # extract results
             for symbol in image:
                 if not symbol.count:
-                    self.data = symbol.data
+                    self.data = _text(symbol.data)
                     self.data_type = self.data_recognise()
-                    callback(symbol.data)
+                    callback(self.data)
 
         proc.set_data_handler(my_handler)
 
@@ -229,5 +276,457 @@ class QR(object):
         except zbar.WindowClosed:
             pass
 
+    def decode_video(self, source, callback=lambda t: None, stride=1,
+                     target=None, max_gap=None, fps=1.0):
+        """Decodes the QR Codes in a video file or an image sequence and
+        returns them as a list of qrvideo.Track objects.
+
+        source is a video file (read through OpenCV), a multi-frame image,
+        a directory of images or a list of image files; only every
+        stride-th frame is scanned. Each distinct code is passed to
+        callback once, see qrvideo.scan_frames() for target and max_gap.
+        fps sets the timestamps of image sequences."""
+        qrvideo = _load('qrvideo')
+        if isinstance(source, (list, tuple)) or os.path.isdir(source) or \
+                source.lower().endswith(qrvideo.SEQUENCE_EXTENSIONS):
+            frames = qrvideo.sequence_frames(source, stride, fps)
+        else:
+            frames = qrvideo.video_frames(source, stride)
+        tracks = []
+        for track in qrvideo.scan_frames(frames, target, max_gap):
+            self.data = track.data
+            self.data_type = self.data_recognise()
+            tracks.append(track)
+            callback(track)
+        return tracks
+
     def destroy(self):
-        shutil.rmtree(self.directory)
+        if self._directory is not None:
+            import shutil
+            shutil.rmtree(self._directory)
+            self._directory = None
+
+
+# Stateless API
+#
+# encode() and decode() keep no state between calls, so they can be used
+# from several threads at once. Their options and results are immutable
+# objects with __slots__, which makes them small enough to keep millions.
+
+class _Frozen(object):
+    """Base of the immutable value types: attributes are only set by
+    __init__, whose arguments are the __slots__ in order."""
+    __slots__ = ()
+
+    def _set(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
+
+    __delattr__ = __setattr__
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def replace(self, **changes):
+        """Returns a copy with some attributes changed."""
+        values = dict(zip(self.__slots__, self._values()))
+        values.update(changes)
+        return self.__class__(**values)
+
+    def __reduce__(self):
+        return self.__class__, self._values()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._values() == other._values()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(
+            '%s=%r' % (name, getattr(self, name)) for name in self.__slots__
+        ))
+
+
+ENCODERS = ('qrencode', 'native')
+
+
+class EncodeOptions(_Frozen):
+    """How to encode: module size in pixels, error correction level ('L',
+    'M', 'Q' or 'H'), quiet zone in modules, data type (a key of
+    QR.data_encode), PNG compression (None to have qrencode write the
+    image, otherwise a qrpng preset or zlib level) and encoder: 'qrencode'
+    to run the qrencode program, or 'native' to encode in process with
+    qrencoder, in which case qrpng always writes the image.
+
+    mask, for the native encoder only, trades size for speed: None scores
+    all eight masks and uses the best, 'fast' only a few, and a mask number
+    (0 to 7) is used as is.  score=True works out the penalty score of a
+    fixed mask too, for EncodeResult.penalty."""
+    __slots__ = ('pixel_size', 'level', 'margin_size', 'data_type',
+                 'compression', 'encoder', 'mask', 'score')
+
+    def __init__(self, pixel_size=3, level='L', margin_size=4,
+                 data_type='text', compression=None, encoder='qrencode',
+                 mask=None, score=False):
+        if data_type not in QR.data_encode:
+            raise ValueError("unknown data type %r" % (data_type,))
+        if encoder not in ENCODERS:
+            raise ValueError("unknown encoder %r" % (encoder,))
+        if mask is not None:
+            if encoder != 'native':
+                raise ValueError("only the native encoder can choose the mask")
+            if mask != 'fast' and mask not in range(8):
+                raise ValueError("mask should be None, 'fast' or 0 to 7")
+        if score and encoder != 'native':
+            raise ValueError("only the native encoder scores masks")
+        self._set(pixel_size=int(pixel_size), level=str(level),
+                  margin_size=int(margin_size), data_type=data_type,
+                  compression=compression, encoder=encoder, mask=mask,
+                  score=bool(score))
+
+
+DEFAULT_OPTIONS = EncodeOptions()
+
+
+class EncodeResult(_Frozen):
+    """An encoded QR Code: the payload bytes and either the file it was
+    written to or, if none was given, the PNG image itself.  The native
+    encoder also reports the mask used and its penalty score, None if the
+    mask was fixed and options.score didn't ask for it."""
+    __slots__ = ('payload', 'filename', 'png', 'mask', 'penalty')
+
+    def __init__(self, payload, filename=None, png=None, mask=None,
+                 penalty=None):
+        self._set(payload=payload, filename=filename, png=png, mask=mask,
+                  penalty=penalty)
+
+
+class Symbol(_Frozen):
+    """A decoded QR Code: its data as a str and the data type recognised."""
+    __slots__ = ('data', 'data_type')
+
+    def __init__(self, data, data_type=None):
+        self._set(data=data, data_type=data_type or data_recognise(data))
+
+
+class DecodeTimeout(list):
+    """What decode() returns when it ran out of time: like finding
+    nothing, an empty list, but telling apart.  seconds is the time limit."""
+    __slots__ = ('seconds',)
+
+    def __init__(self, seconds):
+        list.__init__(self)
+        self.seconds = seconds
+
+    def __repr__(self):
+        return 'DecodeTimeout(%r)' % (self.seconds,)
+
+
+class ImageTooLarge(ValueError):
+    """Raised when an image to decode has more than max_pixels pixels."""
+
+    def __init__(self, width, height, max_pixels):
+        ValueError.__init__(self, width, height, max_pixels)
+        self.width = width
+        self.height = height
+        self.max_pixels = max_pixels
+
+    def __str__(self):
+        return "%dx%d image has more than %d pixels" % (
+            self.width, self.height, self.max_pixels
+        )
+
+
+class EncodeError(Exception):
+    """Raised when qrencode fails; returncode is its exit status."""
+
+    def __init__(self, returncode):
+        Exception.__init__(self, "qrencode exited with status %d" % returncode)
+        self.returncode = returncode
+
+
+def data_recognise(data):
+    """Returns a str indicating the data type of data"""
+    # ignore the BOM encode_payload() puts before text, which some decoders
+    # keep
+    data_lower = data.lstrip('\ufeff').lower()
+    if data_lower.startswith("http://") or data_lower.startswith("https://"):
+        return 'url'
+    elif data_lower.startswith("mailto:"):
+        return 'email'
+    elif data_lower.startswith("matmsg:to:"):
+        return 'emailmessage'
+    elif data_lower.startswith("tel:"):
+        return 'telephone'
+    elif data_lower.startswith("smsto:"):
+        return 'sms'
+    elif data_lower.startswith("mmsto:"):
+        return 'mms'
+    elif data_lower.startswith("geo:"):
+        return 'geo'
+    elif data_lower.startswith("mebkm:title:"):
+        return 'bookmark'
+    elif data_lower.startswith("mecard:"):
+        return 'phonebook'
+    else:
+        return 'text'
+
+
+def encode_payload(data, data_type='text'):
+    """Returns data, formatted as data_type, as UTF-8 encoded bytes"""
+    # FIX-ME: if we don't add the BOM_UTF8 char, QtQR doesn't decode
+    # correctly; but if we add it, mobile apps don't.-
+    # Apparently is a zbar bug.
+    payload = QR.data_encode[data_type](data).encode('utf-8')
+    if data_type == 'text':
+        return BOM_UTF8 + payload
+    return payload
+
+
+def _qrencode(args):
+    import subprocess
+    proc = subprocess.Popen(['qrencode'] + args, stdout=subprocess.PIPE)
+    output = proc.communicate()[0]
+    if proc.returncode != 0:
+        raise EncodeError(proc.returncode)
+    return output
+
+
+def qrencode_matrix(payload, level='L'):
+    """Returns the modules qrencode makes of the payload bytes as a list of
+    rows of booleans (True for dark modules), without the quiet zone."""
+    output = _qrencode(['-t', 'ASCII', '-o', '-', '-m', '0', '-l', level, payload])
+    # every module is printed as two characters, '#' for dark ones
+    return [
+        [c == '#' for c in line[::2]]
+        for line in output.decode('ascii').splitlines()
+    ]
+
+
+def native_code(payload, options=DEFAULT_OPTIONS):
+    """Returns the qrencoder.Code of the payload bytes at options.level,
+    masked as options.mask says."""
+    return _load('qrencoder').make(payload, options.level, mask=options.mask)
+
+
+def encode(data, options=DEFAULT_OPTIONS, filename=None):
+    """Encodes data as a QR Code and returns an EncodeResult.
+
+    data is formatted according to options.data_type, like QR.data; bytes
+    are taken as an already encoded payload. The PNG image is written to
+    filename or, if that is None, kept in the result. Raises EncodeError
+    if qrencode fails, or ValueError if the native encoder can't fit the
+    payload in a QR Code."""
+    if isinstance(data, bytes):
+        payload = data
+    else:
+        payload = encode_payload(data, options.data_type)
+    mask = penalty = None
+    if options.compression is not None or options.encoder == 'native':
+        if options.encoder == 'native':
+            code = native_code(payload, options)
+            if options.score:
+                code.score()
+            mask, penalty = code.mask, code.penalty
+            # qrpng takes the rows as ints, which it packs quickest
+            matrix = code.rows
+        else:
+            matrix = qrencode_matrix(payload, options.level)
+        png = _load('qrpng').png_bytes(
+            matrix, options.pixel_size, options.margin_size,
+            options.compression or 'default'
+        )
+        if filename is not None:
+            with open(filename, 'wb') as f:
+                f.write(png)
+            png = None
+    else:
+        output = _qrencode([
+            '-o', filename or '-',
+            '-s', str(options.pixel_size),
+            '-m', str(options.margin_size),
+            '-l', options.level,
+            payload
+        ])
+        png = None if filename else output
+    return EncodeResult(payload, filename, png, mask, penalty)
+
+
+# data types formatting str data by at most adding to its start, so that the
+# payload of prefix + suffix ends with the suffix
+SUFFIX_DATA_TYPES = ('text', 'url', 'email', 'telephone')
+
+
+def encode_series(prefix, suffixes, options=DEFAULT_OPTIONS):
+    """Yields an EncodeResult, with the PNG image, for the data prefix +
+    suffix of every suffix, e.g. URLs ending in serial numbers.
+
+    Codes are made by the native encoder from a qrencoder.SuffixTemplate
+    per suffix length, so the work shared by all of them is only done once.
+    options.encoder is otherwise ignored, but as for encode(), options.mask
+    and options.score need encoder='native': with the default options every
+    code has all eight masks scored, while e.g. EncodeOptions(
+    encoder='native', mask=4) builds the mask into the template and leaves
+    only the suffix to encode.  options.data_type must be one of
+    SUFFIX_DATA_TYPES."""
+    if options.data_type not in SUFFIX_DATA_TYPES:
+        raise ValueError("can't encode %r data in series" % (options.data_type,))
+    qrencoder = _load('qrencoder')
+    png_bytes = _load('qrpng').png_bytes
+    head = encode_payload(prefix, options.data_type)
+    templates = {}
+    for suffix in suffixes:
+        tail = suffix.encode('utf-8')
+        template = templates.get(len(tail))
+        if template is None:
+            template = templates[len(tail)] = qrencoder.SuffixTemplate(
+                head, len(tail), options.level, mask=options.mask
+            )
+        code = template.make(tail)
+        if options.score:
+            code.score()
+        png = png_bytes(code.rows, options.pixel_size, options.margin_size,
+                        options.compression or 'default')
+        yield EncodeResult(head + tail, None, png, code.mask, code.penalty)
+
+
+def decode(source, cache=None, max_pixels=None, timeout=None, max_memory=None):
+    """Returns the list of Symbols found in source, an image file name, a
+    binary file object or a PIL image.
+
+    cache is an optional qrcache.MemoryCache or qrcache.SQLiteCache, only
+    used for file names; images already seen there, found or not, are not
+    scanned again.
+
+    Images of more than max_pixels pixels raise ImageTooLarge, which is
+    checked before they are decompressed.  With a timeout (in seconds) or
+    max_memory (bytes of address space), the image is decoded in a worker
+    process, which is killed if it takes longer than timeout; decode() then
+    returns a DecodeTimeout.
+
+    max_memory limits the worker's whole address space (RLIMIT_AS), and a
+    worker forked from the calling process starts out with everything that
+    process has mapped.  It must therefore be well above the caller's own
+    virtual size (VmSize in /proc/self/status), or every decode fails with
+    MemoryError."""
+    if timeout is None and max_memory is None:
+        scan, args = _scan_image, (source, max_pixels)
+    elif isinstance(source, str):
+        scan, args = _scan_image, (source, max_pixels)
+    elif hasattr(source, 'mode') and hasattr(source, 'tobytes'):
+        # send the worker the pixels, not the image object
+        _check_size(source.size, max_pixels)
+        pil = source if source.mode == 'L' else source.convert('L')
+        scan, args = _scan_y800, (pil.tobytes(),) + pil.size
+    else:
+        import io
+        scan, args = _scan_image, (io.BytesIO(source.read()), max_pixels)
+    if cache is None or not isinstance(source, str):
+        found = _bounded(scan, args, timeout, max_memory)
+    else:
+        key = _load('qrcache').file_hash(source)
+        try:
+            found = cache[key]
+        except KeyError:
+            found = _bounded(scan, args, timeout, max_memory)
+            if not isinstance(found, DecodeTimeout):
+                cache[key] = found
+    if isinstance(found, DecodeTimeout):
+        return found
+    return [Symbol(data) for data in found]
+
+
+def decode_y800(raw, width, height, cache=None, max_pixels=None,
+                timeout=None, max_memory=None):
+    """Returns the list of Symbols found in 8-bit grayscale (Y800) pixels.
+
+    raw is either the name of a file holding the bare pixels or any object
+    supporting the buffer protocol (bytes, bytearray, mmap, memoryview).
+    The zbar bindings only take bytes, so anything else is copied into
+    bytes once before scanning; bytes are scanned as they are.  A timeout
+    or max_memory has the pixels sent to a worker process as for decode()."""
+    _check_size((width, height), max_pixels)
+    if isinstance(raw, str):
+        with open(raw, 'rb') as f:
+            raw = f.read()
+    args = (raw, width, height)
+    if timeout is not None or max_memory is not None:
+        args = (bytes(raw), width, height)
+    if cache is None:
+        found = _bounded(_scan_y800, args, timeout, max_memory)
+    else:
+        key = _load('qrcache').content_hash(raw)
+        try:
+            found = cache[key]
+        except KeyError:
+            found = _bounded(_scan_y800, args, timeout, max_memory)
+            if not isinstance(found, DecodeTimeout):
+                cache[key] = found
+    if isinstance(found, DecodeTimeout):
+        return found
+    return [Symbol(data) for data in found]
+
+
+def _check_size(size, max_pixels):
+    width, height = size
+    if max_pixels is not None and width * height > max_pixels:
+        raise ImageTooLarge(width, height, max_pixels)
+
+
+def _bounded(scan, args, timeout, max_memory):
+    """Returns scan(*args), run in a worker process if there's a timeout
+    or max_memory, or a DecodeTimeout if it took too long."""
+    if timeout is None and max_memory is None:
+        return scan(*args)
+    qrsandbox = _load('qrsandbox')
+    try:
+        return qrsandbox.sandbox(max_memory).run(scan, args, timeout)
+    except qrsandbox.Timeout:
+        return DecodeTimeout(timeout)
+
+
+def _scan_image(source, max_pixels=None):
+    """Returns the data of the codes found in an image as a tuple of str."""
+    if hasattr(source, 'mode') and hasattr(source, 'tobytes'):
+        pil = source
+        _check_size(pil.size, max_pixels)
+    else:
+        pil = _pil_image().open(source)
+        # open() only reads the header, so nothing is decompressed yet
+        _check_size(pil.size, max_pixels)
+        if pil.format == 'JPEG':
+            # have libjpeg decode the luminance channel only
+            pil.draft('L', pil.size)
+    # convert() copies even when there's nothing to convert
+    if pil.mode != 'L':
+        pil = pil.convert('L')
+    width, height = pil.size
+    return _scan_y800(pil.tobytes(), width, height)
+
+
+def _scan_y800(raw, width, height):
+    """Returns the data of the codes found in the Y800 buffer raw as a tuple
+    of str."""
+    import zbar
+    if not isinstance(raw, bytes):
+        # zbar.Image only accepts bytes
+        raw = bytes(raw)
+    scanner = zbar.ImageScanner()
+    # configure the reader
+    scanner.parse_config('enable')
+    # wrap image data
+    image = zbar.Image(width, height, 'Y800', raw)
+    # scan the image for barcodes
+    if scanner.scan(image) == 0:
+        return ()
+    found = tuple(_text(symbol.data) for symbol in image)
+    # clean up
+    del(image)
+    return found
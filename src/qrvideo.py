@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+# qrvideo.py: Decoding QR Codes from video files and image sequences.
+#
+# `qrvideo.py` is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# `qrvideo.py` is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along
+# with `qrvideo.py`.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+if __package__:
+    from .qrtools import _text
+else:
+    from qrtools import _text
+
+# files PIL reads as several frames
+SEQUENCE_EXTENSIONS = ('.gif', '.tif', '.tiff', '.webp', '.apng')
+
+
+class Track(object):
+    """A code seen in a run of frames: its data, the timestamps (in seconds)
+    of the first and last frames it was found in and how many frames it was
+    found in."""
+
+    def __init__(self, data, timestamp):
+        self.data = data
+        self.first = self.last = timestamp
+        self.frames = 1
+
+    def __repr__(self):
+        return 'Track(%r, first=%.3f, last=%.3f, frames=%d)' % (
+            self.data, self.first, self.last, self.frames
+        )
+
+
+def video_frames(filename, stride=1):
+    """Yields (timestamp, width, height, pixels) for every stride-th frame of
+    a video file, pixels being a Y800 buffer.  Needs OpenCV (cv2)."""
+    import cv2
+    capture = cv2.VideoCapture(filename)
+    if not capture.isOpened():
+        raise IOError("Could not open video file %s" % filename)
+    try:
+        index = 0
+        while True:
+            if index % stride:
+                # grab() skips decoding the frames we don't scan
+                if not capture.grab():
+                    break
+            else:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                height, width = gray.shape
+                timestamp = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                # zbar.Image only accepts bytes, not arrays
+                yield timestamp, width, height, gray.tobytes()
+            index += 1
+    finally:
+        capture.release()
+
+
+def sequence_frames(filenames, stride=1, fps=1.0):
+    """Yields (timestamp, width, height, pixels) for every stride-th frame of
+    an image sequence, pixels being a Y800 buffer.
+
+    filenames is a list of image files, a directory (read in sorted order)
+    or a single multi-frame image such as an animated GIF.  Frames are
+    fps frames per second apart."""
+    try:
+        from PIL import Image, ImageSequence
+    except ImportError:
+        import Image
+        import ImageSequence
+    if isinstance(filenames, str):
+        if os.path.isdir(filenames):
+            filenames = [
+                os.path.join(filenames, f) for f in sorted(os.listdir(filenames))
+            ]
+        else:
+            filenames = [filenames]
+
+    def frames():
+        for filename in filenames:
+            pil = Image.open(filename)
+            if filename.lower().endswith(SEQUENCE_EXTENSIONS):
+                for frame in ImageSequence.Iterator(pil):
+                    yield frame
+            else:
+                yield pil
+
+    for index, pil in enumerate(frames()):
+        if index % stride:
+            continue
+        if pil.mode != 'L':
+            pil = pil.convert('L')
+        width, height = pil.size
+        yield index / float(fps), width, height, pil.tobytes()
+
+
+def scan_frames(frames, target=None, max_gap=None):
+    """Yields a Track for every code found in frames, an iterable of
+    (timestamp, width, height, pixels) such as video_frames() returns.
+
+    A code is tracked for as long as it keeps showing up and is yielded once
+    it has not been seen for more than max_gap seconds, or when frames run
+    out; with max_gap=None every distinct code is yielded once.  If target
+    is given, scanning stops as soon as a code with that data is found."""
+    import zbar
+    scanner = zbar.ImageScanner()
+    scanner.parse_config('enable')
+    tracks = {}
+    for timestamp, width, height, pixels in frames:
+        image = zbar.Image(width, height, 'Y800', pixels)
+        scanner.scan(image)
+        found = set(_text(symbol.data) for symbol in image)
+        del(image)
+        for data in found:
+            track = tracks.get(data)
+            if track is None:
+                tracks[data] = Track(data, timestamp)
+            else:
+                track.last = timestamp
+                track.frames += 1
+        if target in found:
+            break
+        if max_gap is not None:
+            for data, track in list(tracks.items()):
+                if timestamp - track.last > max_gap:
+                    yield tracks.pop(data)
+    for track in sorted(tracks.values(), key=lambda t: t.first):
+        yield track
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+
+# qrworker.py: Decode workers consuming jobs from a shared queue.
+#
+# `qrworker.py` is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# `qrworker.py` is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along
+# with `qrworker.py`.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A queue holds decode jobs, each a (job_id, filename) pair, split into shards
+by job id.  Any object with the methods below can be used as a queue:
+
+    put(job_id, filename)      add a job, unless job_id was added before
+    reserve(count, shards)     claim up to count pending jobs from the given
+                               shards (all of them if None) and return them
+    ack(job_id, data, error)   record a job's result; returns False if the
+                               job had already been acked, so acks can be
+                               safely repeated
+    result(job_id)             returns (data, error), KeyError if not done
+
+SQLiteQueue works on a single machine or a shared file system, RedisQueue
+across the network.
+"""
+
+import json
+import multiprocessing
+import sqlite3
+import threading
+import time
+import zlib
+
+if __package__:
+    from .qrtools import decode
+else:
+    from qrtools import decode
+
+PENDING, RESERVED, DONE = 0, 1, 2
+
+
+def shard_of(job_id, shards):
+    """Returns the shard a job belongs to, the same on every node."""
+    return (zlib.crc32(job_id.encode('utf-8')) & 0xffffffff) % shards
+
+
+class SQLiteQueue(object):
+    """A job queue in the SQLite database at path.  Reserved jobs that are
+    not acked within lease seconds are handed out again."""
+
+    def __init__(self, path, shards=1, lease=300):
+        self.path = path
+        self.shards = shards
+        self.lease = lease
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(
+            path, timeout=60, isolation_level=None, check_same_thread=False
+        )
+        with self.lock:
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'job_id TEXT PRIMARY KEY, filename TEXT, shard INTEGER, '
+                'state INTEGER, expires REAL, data TEXT, error TEXT)'
+            )
+            self.db.execute(
+                'CREATE INDEX IF NOT EXISTS jobs_state ON jobs (shard, state)'
+            )
+
+    def put(self, job_id, filename):
+        with self.lock:
+            self.db.execute(
+                'INSERT OR IGNORE INTO jobs (job_id, filename, shard, state) '
+                'VALUES (?, ?, ?, ?)',
+                (job_id, filename, shard_of(job_id, self.shards), PENDING)
+            )
+
+    def reserve(self, count=1, shards=None):
+        shards = range(self.shards) if shards is None else shards
+        now = time.time()
+        with self.lock:
+            # take the write lock up front so no other process can claim the
+            # same jobs between the SELECT and the UPDATE
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                jobs = self.db.execute(
+                    'SELECT job_id, filename FROM jobs WHERE shard IN (%s) '
+                    'AND (state = ? OR (state = ? AND expires < ?)) LIMIT ?'
+                    % ','.join('?' * len(shards)),
+                    tuple(shards) + (PENDING, RESERVED, now, count)
+                ).fetchall()
+                self.db.executemany(
+                    'UPDATE jobs SET state = ?, expires = ? WHERE job_id = ?',
+                    [(RESERVED, now + self.lease, job[0]) for job in jobs]
+                )
+                self.db.execute('COMMIT')
+            except:
+                self.db.execute('ROLLBACK')
+                raise
+        return jobs
+
+    def ack(self, job_id, data, error=None):
+        with self.lock:
+            return self.db.execute(
+                'UPDATE jobs SET state = ?, data = ?, error = ? '
+                'WHERE job_id = ? AND state != ?',
+                (DONE, data, error, job_id, DONE)
+            ).rowcount == 1
+
+    def result(self, job_id):
+        with self.lock:
+            row = self.db.execute(
+                'SELECT data, error FROM jobs WHERE job_id = ? AND state = ?',
+                (job_id, DONE)
+            ).fetchone()
+        if row is None:
+            raise KeyError(job_id)
+        return row[0], row[1]
+
+    def pending(self):
+        """Returns the number of jobs not acked yet."""
+        with self.lock:
+            return self.db.execute(
+                'SELECT COUNT(*) FROM jobs WHERE state != ?', (DONE,)
+            ).fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+
+class RedisQueue(object):
+    """A job queue on a Redis server; client is a redis.Redis instance or
+    anything with the same hget, hset, hsetnx, hdel, lpush, rpoplpush,
+    lrem, lrange and llen methods.  Keys are prefixed with name.
+
+    Every shard is a list of pending job ids; reserved ones are moved to a
+    per-shard processing list and given a lease.  Like SQLiteQueue, jobs
+    not acked within lease seconds, e.g. after a worker crash, are handed
+    out again."""
+
+    def __init__(self, client, name='qrtools', shards=1, lease=300):
+        self.client = client
+        self.name = name
+        self.shards = shards
+        self.lease = lease
+
+    def _key(self, *parts):
+        return ':'.join((self.name,) + tuple(str(p) for p in parts))
+
+    def _text(self, value):
+        if isinstance(value, bytes):
+            return value.decode('utf-8')
+        return value
+
+    def put(self, job_id, filename):
+        if self.client.hsetnx(self._key('jobs'), job_id, filename):
+            shard = shard_of(job_id, self.shards)
+            self.client.lpush(self._key('pending', shard), job_id)
+
+    def reserve(self, count=1, shards=None):
+        shards = range(self.shards) if shards is None else shards
+        self.requeue(shards)
+        jobs = []
+        for shard in shards:
+            while len(jobs) < count:
+                job_id = self.client.rpoplpush(
+                    self._key('pending', shard), self._key('processing', shard)
+                )
+                if job_id is None:
+                    break
+                job_id = self._text(job_id)
+                self.client.hset(
+                    self._key('expires'), job_id, time.time() + self.lease
+                )
+                filename = self._text(self.client.hget(self._key('jobs'), job_id))
+                jobs.append((job_id, filename))
+        return jobs
+
+    def ack(self, job_id, data, error=None):
+        new = self.client.hsetnx(
+            self._key('results'), job_id, json.dumps([data, error])
+        )
+        self.client.lrem(
+            self._key('processing', shard_of(job_id, self.shards)), 0, job_id
+        )
+        self.client.hdel(self._key('expires'), job_id)
+        return bool(new)
+
+    def result(self, job_id):
+        value = self.client.hget(self._key('results'), job_id)
+        if value is None:
+            raise KeyError(job_id)
+        data, error = json.loads(self._text(value))
+        return data, error
+
+    def requeue(self, shards=None):
+        """Moves the jobs of shards whose lease has expired back to pending;
+        reserve() does so before reserving."""
+        shards = range(self.shards) if shards is None else shards
+        now = time.time()
+        for shard in shards:
+            processing = self._key('processing', shard)
+            for job_id in self.client.lrange(processing, 0, -1):
+                job_id = self._text(job_id)
+                expires = self.client.hget(self._key('expires'), job_id)
+                if expires is None:
+                    # reserved a moment ago and not given a lease yet
+                    self.client.hsetnx(
+                        self._key('expires'), job_id, now + self.lease
+                    )
+                elif float(self._text(expires)) < now:
+                    # only the one that removes it requeues it
+                    if self.client.lrem(processing, 1, job_id):
+                        self.client.hdel(self._key('expires'), job_id)
+                        self.client.lpush(self._key('pending', shard), job_id)
+
+    def pending(self):
+        """Returns the number of jobs not acked yet."""
+        return sum(
+            self.client.llen(self._key('pending', s)) +
+            self.client.llen(self._key('processing', s))
+            for s in range(self.shards)
+        )
+
+
+class Stats(object):
+    """Counters of a worker's jobs; rate() is jobs per second."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.jobs = 0
+        self.found = 0
+        self.failed = 0
+        self.duplicates = 0
+
+    def rate(self):
+        elapsed = time.time() - self.started
+        return self.jobs / elapsed if elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return 'Stats(jobs=%d, found=%d, failed=%d, duplicates=%d, rate=%.1f/s)' % (
+            self.jobs, self.found, self.failed, self.duplicates, self.rate()
+        )
+
+
+def decode_job(job):
+    """Decodes a (job_id, filename) job and returns (job_id, data, error)."""
+    job_id, filename = job
+    try:
+        symbols = decode(filename)
+        return job_id, symbols[-1].data if symbols else None, None
+    except Exception as e:
+        return job_id, None, '%s: %s' % (e.__class__.__name__, e)
+
+
+class Worker(object):
+    """Decodes the jobs of queue, from the given shards (all if None), in a
+    pool of processes (one per CPU if None), batch jobs at a time."""
+
+    def __init__(self, queue, processes=None, shards=None, batch=32):
+        self.queue = queue
+        self.processes = processes
+        self.shards = shards
+        self.batch = batch
+        self.stats = Stats()
+
+    def run(self, max_jobs=None, idle_timeout=None, poll_interval=1.0):
+        """Processes jobs until max_jobs are done or the queue has been empty
+        for idle_timeout seconds (None to wait for ever).  Returns the
+        worker's Stats."""
+        pool = multiprocessing.Pool(self.processes)
+        idle_since = time.time()
+        try:
+            while max_jobs is None or self.stats.jobs < max_jobs:
+                count = self.batch
+                if max_jobs is not None:
+                    count = min(count, max_jobs - self.stats.jobs)
+                jobs = self.queue.reserve(count, self.shards)
+                if not jobs:
+                    if idle_timeout is not None and \
+                            time.time() - idle_since >= idle_timeout:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                for job_id, data, error in pool.imap_unordered(decode_job, jobs):
+                    if not self.queue.ack(job_id, data, error):
+                        self.stats.duplicates += 1
+                    self.stats.jobs += 1
+                    if error is not None:
+                        self.stats.failed += 1
+                    elif data is not None:
+                        self.stats.found += 1
+                idle_since = time.time()
+        finally:
+            pool.terminate()
+            pool.join()
+        return self.stats
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Decode the jobs of a qrtools SQLite job queue.'
+    )
+    parser.add_argument('queue', help='SQLite queue database')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='number of shards the queue is split into')
+    parser.add_argument('--shard', type=int, action='append',
+                        help='shard to work on (may be repeated; default all)')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--idle-timeout', type=float, default=None)
+    args = parser.parse_args()
+    worker = Worker(
+        SQLiteQueue(args.queue, args.shards),
+        processes=args.processes, shards=args.shard
+    )
+    print(worker.run(idle_timeout=args.idle_timeout))
@@ -1,4 +1,4 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python3
 #-*- encoding: utf-8 -*-
 
 """
@@ -43,15 +43,15 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Templates for creating QRCodes supported by qrtools
         self.templates = {
-            "text": unicode("Text"),
-            "url": unicode("URL"),
-            "bookmark": unicode("Bookmark"),
-            "emailmessage": unicode("E-Mail"),
-            "telephone": unicode("Telephone Number"),
-            "phonebook": unicode("Contact Information (PhoneBook)"),
-            "sms": unicode("SMS"),
-            "mms": unicode("MMS"),
-            "geo": unicode("Geolocalization"),
+            "text": "Text",
+            "url": "URL",
+            "bookmark": "Bookmark",
+            "emailmessage": "E-Mail",
+            "telephone": "Telephone Number",
+            "phonebook": "Contact Information (PhoneBook)",
+            "sms": "SMS",
+            "mms": "MMS",
+            "geo": "Geolocalization",
             }
         # With this we make the dict bidirectional
         self.templates.update( dict((self.templates[k], k) for k in self.templates))
@@ -366,7 +366,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.smsBodyEdit.textChanged.connect(self.qrencode)
         self.smsBodyEdit.textChanged.connect(
             lambda: self.smsCharCount.setText(
-                unicode("characters count: %s - %d message(s)") % (
+                "characters count: %s - %d message(s)" % (
                 len(self.smsBodyEdit.toPlainText()),
                 ceil(len(self.smsBodyEdit.toPlainText()) / 160.0)
                 )                    
@@ -393,27 +393,27 @@ class MainWindow(QtWidgets.QMainWindow):
     def qrencode(self):
         #Functions to get the correct data
         data_fields = {
-            "text": unicode(self.textEdit.toPlainText()),
-            "url": unicode(self.urlEdit.text()),
-            "bookmark": ( unicode(self.bookmarkTitleEdit.text()), unicode(self.bookmarkUrlEdit.text()) ),
-            "email": unicode(self.emailEdit.text()),
-            "emailmessage": ( unicode(self.emailEdit.text()), unicode(self.emailSubjectEdit.text()), unicode(self.emailBodyEdit.toPlainText()) ),
-            "telephone": unicode(self.telephoneEdit.text()),
-            "phonebook": (('N',unicode(self.phonebookNameEdit.text())),
-                          ('TEL', unicode(self.phonebookTelEdit.text())),
-                          ('EMAIL',unicode(self.phonebookEMailEdit.text())),
-                          ('NOTE', unicode(self.phonebookNoteEdit.text())),
-                          ('BDAY', unicode(self.phonebookBirthdayEdit.date().toString("yyyyMMdd"))), #YYYYMMDD
-                          ('ADR', unicode(self.phonebookAddressEdit.text())),  #The fields divided by commas (,) denote PO box, room number, house number, city, prefecture, zip code and country, in order.
-                          ('URL', unicode(self.phonebookUrlEdit.text())),
+            "text": str(self.textEdit.toPlainText()),
+            "url": str(self.urlEdit.text()),
+            "bookmark": ( str(self.bookmarkTitleEdit.text()), str(self.bookmarkUrlEdit.text()) ),
+            "email": str(self.emailEdit.text()),
+            "emailmessage": ( str(self.emailEdit.text()), str(self.emailSubjectEdit.text()), str(self.emailBodyEdit.toPlainText()) ),
+            "telephone": str(self.telephoneEdit.text()),
+            "phonebook": (('N',str(self.phonebookNameEdit.text())),
+                          ('TEL', str(self.phonebookTelEdit.text())),
+                          ('EMAIL',str(self.phonebookEMailEdit.text())),
+                          ('NOTE', str(self.phonebookNoteEdit.text())),
+                          ('BDAY', str(self.phonebookBirthdayEdit.date().toString("yyyyMMdd"))), #YYYYMMDD
+                          ('ADR', str(self.phonebookAddressEdit.text())),  #The fields divided by commas (,) denote PO box, room number, house number, city, prefecture, zip code and country, in order.
+                          ('URL', str(self.phonebookUrlEdit.text())),
                           # ('NICKNAME', ''),
                         ),
-            "sms": ( unicode(self.smsNumberEdit.text()), unicode(self.smsBodyEdit.toPlainText()) ),
-            "mms": ( unicode(self.mmsNumberEdit.text()), unicode(self.mmsBodyEdit.toPlainText()) ),
-            "geo": ( unicode(self.geoLatEdit.text()), unicode(self.geoLongEdit.text()) ),
+            "sms": ( str(self.smsNumberEdit.text()), str(self.smsBodyEdit.toPlainText()) ),
+            "mms": ( str(self.mmsNumberEdit.text()), str(self.mmsBodyEdit.toPlainText()) ),
+            "geo": ( str(self.geoLatEdit.text()), str(self.geoLongEdit.text()) ),
         }
 
-        data_type = unicode(self.templates[unicode(self.selector.currentText())])
+        data_type = str(self.templates[str(self.selector.currentText())])
         data = data_fields[data_type]
         
         level = (u'L',u'M',u'Q',u'H')
@@ -422,20 +422,21 @@ class MainWindow(QtWidgets.QMainWindow):
             if data_type == 'emailmessage' and data[1] == '' and data[2] == '':
                 data_type = 'email'
                 data = data_fields[data_type]
-            qr = QR(pixel_size = unicode(self.pixelSize.value()),
+            qr = QR(pixel_size = str(self.pixelSize.value()),
                     data = data,
-                    level = unicode(level[self.ecLevel.currentIndex()]),
-                    margin_size = unicode(self.marginSize.value()),
+                    level = str(level[self.ecLevel.currentIndex()]),
+                    margin_size = str(self.marginSize.value()),
                     data_type = data_type,
                     )
             if qr.encode() == 0:
+                self.qr = qr
                 self.qrcode.setPixmap(QtGui.QPixmap(qr.filename))
                 self.saveButton.setEnabled(True)
             else:
                 if NOTIFY:
                     n = pynotify.Notification(
                         "QtQR",
-                        unicode("ERROR: Something went wrong while trying to generate the QR Code."),
+                        "ERROR: Something went wrong while trying to generate the QR Code.",
                         "qtqr"
                         )
                     n.show()
@@ -455,19 +456,34 @@ class MainWindow(QtWidgets.QMainWindow):
             if not fname.lower().endswith(u".png"):
                 fname += u".png"
             
-            self.qrcode.pixmap().save(fname)
-            if NOTIFY:
+            # Write the modules as a 1-bit PNG instead of re-saving the
+            # pixmap at full colour depth.
+            if self.qr.encode(fname, compression='small') != 0:
+                if NOTIFY:
+                    n = pynotify.Notification(
+                        "Save QR Code",
+                        "ERROR: Something went wrong while trying to save the QR Code to %s" % fname,
+                        "qtqr"
+                        )
+                    n.show()
+                else:
+                    QtWidgets.QMessageBox.warning(
+                        self,
+                        'Save QRCode',
+                        'Something went wrong while trying to save the QRCode to <b>%s</b>.' % fname
+                        )
+            elif NOTIFY:
                 n = pynotify.Notification(
-                    unicode("Save QR Code"),
-                    unicode("QR Code succesfully saved to %s") % fname,
+                    "Save QR Code",
+                    "QR Code succesfully saved to %s" % fname,
                     "qtqr"
                     )
                 n.show()
             else:
                QtWidgets.QMessageBox.information(
                     self, 
-                    unicode('Save QRCode'),
-                    unicode('QRCode succesfully saved to <b>%s</b>.') % fname
+                    'Save QRCode',
+                    'QRCode succesfully saved to <b>%s</b>.' % fname
                     )
 
     def decodeFile(self, fn=None):
@@ -489,7 +505,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 QtWidgets.QMessageBox.information(
                     self,
                     'Decode File',
-                    unicode('No QRCode could be found in file: <b>%s</b>.') % fname
+                    'No QRCode could be found in file: <b>%s</b>.' % fname
                 )
 #        else:
 #            QtWidgets.QMessageBox.information(
@@ -503,25 +519,25 @@ class MainWindow(QtWidgets.QMainWindow):
     def showInfo(self, qr):
         dt = qr.data_type
         data = qr.data_decode[dt](qr.data)
-        print(dt.encode(u"utf-8") + ':', data)
+        print(dt + ':', data)
         if type(data) == tuple:
             for d in data:
-                print(d.encode(u"utf-8"))
+                print(d)
         elif type(data) == dict:
                 # FIX-ME: Print the decoded symbols
                 print("Dict")
                 print(data.keys())
                 print(data.values())
         else:
-            print(data.encode(u"utf-8"))
+            print(data)
         msg = {
-            'text': lambda : unicode("QRCode contains the following text:\n\n%s") % (data),
-            'url': lambda : unicode("QRCode contains the following url address:\n\n%s") % (data),
-            'bookmark': lambda: unicode("QRCode contains a bookmark:\n\nTitle: %s\nURL: %s") % (data),
-            'email': lambda : unicode("QRCode contains the following e-mail address:\n\n%s") % (data),
-            'emailmessage': lambda : unicode("QRCode contains an e-mail message:\n\nTo: %s\nSubject: %s\nMessage: %s") % (data),
-            'telephone': lambda : unicode("QRCode contains a telephone number: ") + (data),
-            'phonebook': lambda : unicode("QRCode contains a phonebook entry:\n\nName: %s\nTel: %s\nE-Mail: %s\nNote: %s\nBirthday: %s\nAddress: %s\nURL: %s") %
+            'text': lambda : "QRCode contains the following text:\n\n%s" % (data),
+            'url': lambda : "QRCode contains the following url address:\n\n%s" % (data),
+            'bookmark': lambda: "QRCode contains a bookmark:\n\nTitle: %s\nURL: %s" % (data),
+            'email': lambda : "QRCode contains the following e-mail address:\n\n%s" % (data),
+            'emailmessage': lambda : "QRCode contains an e-mail message:\n\nTo: %s\nSubject: %s\nMessage: %s" % (data),
+            'telephone': lambda : "QRCode contains a telephone number: " + (data),
+            'phonebook': lambda : "QRCode contains a phonebook entry:\n\nName: %s\nTel: %s\nE-Mail: %s\nNote: %s\nBirthday: %s\nAddress: %s\nURL: %s" %
                 (data.get('N') or "", 
                  data.get('TEL') or "", 
                  data.get('EMAIL') or "", 
@@ -529,9 +545,9 @@ class MainWindow(QtWidgets.QMainWindow):
                  QtCore.QDate.fromString(data.get('BDAY') or "",'yyyyMMdd').toString(), 
                  data.get('ADR') or "",
                  data.get('URL') or ""),
-            'sms': lambda : unicode("QRCode contains the following SMS message:\n\nTo: %s\nMessage: %s") % (data),
-            'mms': lambda : unicode("QRCode contains the following MMS message:\n\nTo: %s\nMessage: %s") % (data),
-            'geo': lambda : unicode("QRCode contains the following coordinates:\n\nLatitude: %s\nLongitude:%s") % (data),
+            'sms': lambda : "QRCode contains the following SMS message:\n\nTo: %s\nMessage: %s" % (data),
+            'mms': lambda : "QRCode contains the following MMS message:\n\nTo: %s\nMessage: %s" % (data),
+            'geo': lambda : "QRCode contains the following coordinates:\n\nLatitude: %s\nLongitude:%s" % (data),
         }
         wanna = "\n\nDo you want to "
         action = {
@@ -658,7 +674,7 @@ class MainWindow(QtWidgets.QMainWindow):
         QtWidgets.QMessageBox.about(
             self,
             "About QtQR",
-            unicode('<h1>QtQR %s</h1><p>A simple software for creating and decoding QR Codes that uses <a href="https://code.launchpad.net/~qr-tools-developers/qr-tools/python-qrtools-trunk">python-qrtools</a> as backend. Both are part of the <a href="https://launchpad.net/qr-tools">QR Tools</a> project.</p><p></p><p>This is Free Software: GNU-GPLv3</p><p></p><p>Please visit our website for more information and to check out the code:<br /><a href="https://launchpad.net/~qr-tools-developers/qtqr">https://launchpad.net/~qr-tools-developers/qtqr</p><p>copyright &copy; Ramiro Algozino &lt;<a href="mailto:algozino@gmail.com">algozino@gmail.com</a>&gt;</p>') % __version__,
+            '<h1>QtQR %s</h1><p>A simple software for creating and decoding QR Codes that uses <a href="https://code.launchpad.net/~qr-tools-developers/qr-tools/python-qrtools-trunk">python-qrtools</a> as backend. Both are part of the <a href="https://launchpad.net/qr-tools">QR Tools</a> project.</p><p></p><p>This is Free Software: GNU-GPLv3</p><p></p><p>Please visit our website for more information and to check out the code:<br /><a href="https://launchpad.net/~qr-tools-developers/qtqr">https://launchpad.net/~qr-tools-developers/qtqr</p><p>copyright &copy; Ramiro Algozino &lt;<a href="mailto:algozino@gmail.com">algozino@gmail.com</a>&gt;</p>' % __version__,
         )
 
     def dragEnterEvent(self, event):
@@ -668,7 +684,7 @@ class MainWindow(QtWidgets.QMainWindow):
     def dropEvent(self, event):
         for fn in event.mimeData().urls():
             fn = fn.toLocalFile()
-            self.decodeFile(unicode(fn))
+            self.decodeFile(str(fn))
 
 
 class VideoDevices(QtWidgets.QDialog):
@@ -722,7 +738,7 @@ if __name__ == '__main__':
     app = QtWidgets.QApplication(sys.argv)
     # This is to make Qt use locale configuration; i.e. Standard Buttons
     # in your system's language. 
-    locale = unicode(QtCore.QLocale.system().name())
+    locale = str(QtCore.QLocale.system().name())
     translator=QtCore.QTranslator()
     # translator.load(os.path.join(os.path.abspath(
         # os.path.dirname(__file__)),
@@ -744,7 +760,7 @@ if __name__ == '__main__':
     mw.show()
     if len(app.arguments())>1:
         #Open the file and try to decode it
-        for fn in app.argv()[1:]:
+        for fn in app.arguments()[1:]:
             # We should check if the file exists.
             mw.decodeFile(fn)
     sys.exit(app.exec_())
@@ -0,0 +1,122 @@
+import io
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import qrbulk
+
+
+class EscapeTest(unittest.TestCase):
+
+    def test_mecard_escape(self):
+        self.assertEqual(qrbulk.mecard_escape('a;b:c,d\\e'), 'a\\;b\\:c\\,d\\\\e')
+
+    def test_vcard_escape(self):
+        # : needs no escaping in a vCard value; line breaks do
+        self.assertEqual(qrbulk.vcard_escape('a;b:c,d\\e'), 'a\\;b:c\\,d\\\\e')
+        self.assertEqual(qrbulk.vcard_escape('1\r\n2\r3\n4'), '1\\n2\\n3\\n4')
+
+
+class MecardTest(unittest.TestCase):
+
+    def test_fields_in_order_and_escaped(self):
+        record = {'note': 'Call: 9;30, sharp', 'tel': '555', 'N': 'Doe, John',
+                  'unknown': 'ignored', 'URL': ''}
+        self.assertEqual(qrbulk.mecard(record),
+                         'MECARD:N:Doe,John;TEL:555;NOTE:Call\\: 9\\;30\\, sharp;;')
+
+    def test_structured_field_from_list(self):
+        self.assertEqual(qrbulk.mecard({'N': ['Doe', 'J,R']}),
+                         'MECARD:N:Doe,J\\,R;;')
+        self.assertEqual(
+            qrbulk.mecard({'ADR': ['', None, '1 Main St', 'Springfield']}),
+            'MECARD:ADR:,,1 Main St,Springfield;;'
+        )
+
+    def test_several_values(self):
+        self.assertEqual(qrbulk.mecard({'TEL': ['555', '', '556']}),
+                         'MECARD:TEL:555;TEL:556;;')
+
+    def test_numbers_and_zero(self):
+        self.assertEqual(qrbulk.mecard({'TEL': 5551234, 'NOTE': 0, 'BDAY': None}),
+                         'MECARD:TEL:5551234;NOTE:0;;')
+        self.assertEqual(qrbulk.mecard({'TEL': [0, 1.5]}),
+                         'MECARD:TEL:0;TEL:1.5;;')
+
+
+class VcardTest(unittest.TestCase):
+
+    def test_fn_made_of_n(self):
+        self.assertEqual(qrbulk.vcard({'N': 'Doe, John', 'TEL': 5551234}), '\r\n'.join([
+            'BEGIN:VCARD', 'VERSION:3.0', 'N:Doe;John', 'FN:John Doe',
+            'TEL:5551234', 'END:VCARD',
+        ]))
+
+    def test_fn_and_escaping(self):
+        record = {'FN': 'Doe; J', 'N': ['Doe', 'J'], 'ORG': 'A, B\nC',
+                  'ADR': ('', '', 'Main St; 1', 'X')}
+        self.assertEqual(qrbulk.vcard(record), '\r\n'.join([
+            'BEGIN:VCARD', 'VERSION:3.0', 'N:Doe;J', 'FN:Doe\\; J',
+            'ADR:;;Main St\\; 1;X', 'ORG:A\\, B\\nC', 'END:VCARD',
+        ]))
+
+
+class ReadRecordsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_csv_with_byte_order_mark(self):
+        path = self.write('contacts.csv', b'\xef\xbb\xbfN,TEL\r\nDoe,555\r\n')
+        records = list(qrbulk.read_records(path))
+        self.assertEqual(records, [{'N': 'Doe', 'TEL': '555'}])
+        self.assertEqual(qrbulk.mecard(records[0]), 'MECARD:N:Doe;TEL:555;;')
+
+    def test_jsonl(self):
+        path = self.write('contacts.jsonl',
+                          b'{"N": "Doe", "TEL": 5551234}\n\n{"N": "Roe"}\n')
+        self.assertEqual(list(qrbulk.read_records(path)),
+                         [{'N': 'Doe', 'TEL': 5551234}, {'N': 'Roe'}])
+
+    def test_file_object_and_format(self):
+        source = io.StringIO('{"N": "Doe"}\n')
+        self.assertEqual(list(qrbulk.read_records(source, 'jsonl')), [{'N': 'Doe'}])
+        self.assertRaises(ValueError, list, qrbulk.read_records(source, 'xml'))
+
+
+class EncodeCardsTest(unittest.TestCase):
+
+    def test_tar(self):
+        records = [
+            {'name': 'doe', 'N': 'Doe, John', 'TEL': 5551234},
+            {'N': 'Roe', 'TEL': 0},
+            {'name': 'long', 'NOTE': 'x' * 3000},
+        ]
+        target = io.BytesIO()
+        skipped = []
+        count = qrbulk.encode_cards(records, target, card='vcard',
+                                    name_field='name', processes=1,
+                                    skipped=skipped)
+        self.assertEqual(count, 2)
+        self.assertEqual(skipped, ['long'])
+        target.seek(0)
+        with tarfile.open(fileobj=target) as archive:
+            self.assertEqual(archive.getnames(), ['doe.png', '000001.png'])
+            png = archive.extractfile('doe.png').read()
+        self.assertTrue(png.startswith(b'\x89PNG\r\n\x1a\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
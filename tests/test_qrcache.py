@@ -0,0 +1,138 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import qrcache
+
+
+class Clock(object):
+    """Stands in for the time module in qrcache."""
+
+    def __init__(self):
+        self.now = 1000000.0
+
+    def time(self):
+        return self.now
+
+
+class CacheTests(object):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.time, qrcache.time = qrcache.time, self.clock
+
+    def tearDown(self):
+        qrcache.time = self.time
+
+    def test_round_trip(self):
+        cache = self.make_cache()
+        cache['a'] = ('http://example.com/', 'caf\xe9 \u2603')
+        cache['b'] = ()
+        self.assertEqual(cache['a'], ('http://example.com/', 'caf\xe9 \u2603'))
+        self.assertEqual(cache['b'], ())
+        self.assertEqual(len(cache), 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_missing_key(self):
+        self.assertRaises(KeyError, self.make_cache().__getitem__, 'a')
+
+    def test_positive_ttl(self):
+        cache = self.make_cache(ttl=60, negative_ttl=300)
+        cache['found'] = ('data',)
+        cache['nothing'] = ()
+        self.clock.now += 61
+        # decoded data has expired, the failed decode not yet
+        self.assertRaises(KeyError, cache.__getitem__, 'found')
+        self.assertEqual(cache['nothing'], ())
+        self.clock.now += 240
+        self.assertRaises(KeyError, cache.__getitem__, 'nothing')
+
+    def test_results_kept_for_ever_by_default(self):
+        cache = self.make_cache()
+        cache['found'] = ('data',)
+        cache['nothing'] = ()
+        self.clock.now += 10 ** 6
+        self.assertEqual(cache['found'], ('data',))
+        self.assertRaises(KeyError, cache.__getitem__, 'nothing')
+
+    def test_setting_again_renews(self):
+        cache = self.make_cache(ttl=60)
+        cache['a'] = ('old',)
+        self.clock.now += 50
+        cache['a'] = ('new',)
+        self.clock.now += 50
+        self.assertEqual(cache['a'], ('new',))
+
+
+class MemoryCacheTest(CacheTests, unittest.TestCase):
+
+    def make_cache(self, **kwargs):
+        return qrcache.MemoryCache(**kwargs)
+
+    def test_least_recently_used_goes_first(self):
+        cache = qrcache.MemoryCache(maxsize=2)
+        cache['a'] = ('1',)
+        cache['b'] = ('2',)
+        # a is now more recently used than b
+        self.assertEqual(cache['a'], ('1',))
+        cache['c'] = ('3',)
+        self.assertEqual(len(cache), 2)
+        self.assertRaises(KeyError, cache.__getitem__, 'b')
+        self.assertEqual(cache['a'], ('1',))
+        self.assertEqual(cache['c'], ('3',))
+
+
+class SQLiteCacheTest(CacheTests, unittest.TestCase):
+
+    def setUp(self):
+        CacheTests.setUp(self)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.db')
+
+    def tearDown(self):
+        CacheTests.tearDown(self)
+        shutil.rmtree(self.directory)
+
+    def make_cache(self, **kwargs):
+        cache = qrcache.SQLiteCache(self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_shared_through_the_database(self):
+        self.make_cache()['a'] = ('MECARD:N:Doe\\;J;;', '')
+        self.assertEqual(self.make_cache()['a'], ('MECARD:N:Doe\\;J;;', ''))
+
+    def test_purge(self):
+        cache = self.make_cache(ttl=60)
+        cache['old'] = ('1',)
+        self.clock.now += 30
+        cache['new'] = ('2',)
+        cache['kept'] = ()
+        self.clock.now += 31
+        cache.purge()
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache['new'], ('2',))
+
+
+class HashTest(unittest.TestCase):
+
+    def test_file_and_content_hash_agree(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        data = os.urandom(3 * qrcache.CHUNK_SIZE + 5)
+        path = os.path.join(directory, 'image.png')
+        with open(path, 'wb') as f:
+            f.write(data)
+        self.assertEqual(qrcache.file_hash(path), qrcache.content_hash(data))
+        self.assertEqual(qrcache.content_hash(memoryview(data)),
+                         qrcache.content_hash(data))
+        self.assertNotEqual(qrcache.content_hash(b'a'), qrcache.content_hash(b'b'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import qrencoder
+
+# b'hello' at level L with mask 2, as the qrcode package encodes it
+HELLO_L_MASK_2 = [
+    0x1fc77f, 0x105d41, 0x17475d, 0x17595d, 0x17495d, 0x105241, 0x1fd57f,
+    0x000800, 0x1f72aa, 0x171bcd, 0x08cd6e, 0x1ea3cc, 0x067121, 0x001929,
+    0x1fd296, 0x104c3e, 0x175292, 0x1757e8, 0x175164, 0x105bdc, 0x1fd912,
+]
+
+
+def digest(code):
+    """SHA-1 of the modules as a string of 0 and 1, row by row."""
+    fmt = '0%db' % code.size
+    return hashlib.sha1(
+        ''.join(format(r, fmt) for r in code.rows).encode('ascii')
+    ).hexdigest()
+
+
+def gf_eval(codeword, x):
+    result = 0
+    for c in codeword:
+        result = qrencoder.gf_mul(result, x) ^ c
+    return result
+
+
+class ReedSolomonTest(unittest.TestCase):
+
+    def test_known_remainder(self):
+        # the 1-M example of ISO/IEC 18004 annex I
+        data = bytes([0x10, 0x20, 0x0c, 0x56, 0x61, 0x80, 0xec, 0x11,
+                      0xec, 0x11, 0xec, 0x11, 0xec, 0x11, 0xec, 0x11])
+        self.assertEqual(
+            qrencoder.rs_remainder(data, 10),
+            bytes([0xa5, 0x24, 0xd4, 0xc1, 0xed, 0x36, 0xc7, 0x87, 0x2c, 0x55])
+        )
+
+    def test_codewords_have_zero_syndromes(self):
+        data = bytes(range(7, 250, 3))
+        for degree in (7, 10, 18, 30):
+            codeword = data + qrencoder.rs_remainder(data, degree)
+            x = 1
+            for _ in range(degree):
+                self.assertEqual(gf_eval(codeword, x), 0)
+                x = qrencoder.gf_mul(x, 2)
+
+
+class LayoutTest(unittest.TestCase):
+
+    def test_format_bits(self):
+        expected = {
+            ('L', 0): 0b111011111000100, ('L', 4): 0b110011000101111,
+            ('L', 7): 0b110100101110110, ('M', 0): 0b101010000010010,
+            ('Q', 0): 0b011010101011111, ('H', 0): 0b001011010001001,
+            ('H', 7): 0b000100000111011,
+        }
+        for (level, mask), bits in expected.items():
+            self.assertEqual(qrencoder.format_bits(level, mask), bits)
+
+    def test_version_bits(self):
+        self.assertEqual(qrencoder.version_bits(7), 0x07c94)
+        self.assertEqual(qrencoder.version_bits(40), 0x28c69)
+
+    def test_capacity(self):
+        for version, level, length in ((1, 'L', 17), (1, 'H', 7),
+                                       (10, 'M', 213), (40, 'L', 2953),
+                                       (40, 'H', 1273)):
+            self.assertEqual(qrencoder.capacity(version, level), length)
+
+    def test_choose_version(self):
+        self.assertEqual(qrencoder.choose_version(17, 'L'), 1)
+        self.assertEqual(qrencoder.choose_version(18, 'L'), 2)
+        self.assertEqual(qrencoder.choose_version(1, 'L', 5), 5)
+        self.assertRaises(ValueError, qrencoder.choose_version, 2954, 'L')
+
+    def test_block_layout(self):
+        self.assertEqual(qrencoder.block_layout(5, 'Q'), (62, 18, [15, 15, 16, 16]))
+
+
+class EncodeTest(unittest.TestCase):
+
+    def test_known_matrices(self):
+        code = qrencoder.make(b'hello', 'L', mask=2)
+        self.assertEqual((code.version, code.mask), (1, 2))
+        self.assertEqual(code.rows, HELLO_L_MASK_2)
+        # version 7 has version information; version 4 an alignment pattern
+        code = qrencoder.make(bytes(range(100)), 'M', 7, mask=5)
+        self.assertEqual(digest(code), '42508b61a32620697d3d5506d7e27be26ae9d774')
+        code = qrencoder.make(b'https://example.com/some/path?x=1', 'Q', mask=3)
+        self.assertEqual(code.version, 4)
+        self.assertEqual(digest(code), '05b33f21505803de4155953b0590b17913ffbaa7')
+
+    def test_mask_choice_has_lowest_penalty(self):
+        for payload, level in ((b'https://example.com/', 'L'),
+                               (bytes(range(200)), 'H')):
+            code = qrencoder.make(payload, level)
+            scores = [
+                qrencoder.make(payload, level, mask=m).score() for m in range(8)
+            ]
+            self.assertEqual(code.penalty, min(scores))
+            self.assertEqual(code.penalty, scores[code.mask])
+
+    def test_fixed_mask_is_scored_on_demand(self):
+        code = qrencoder.make(b'hello', 'L', mask=2)
+        self.assertIsNone(code.penalty)
+        self.assertEqual(code.score(), qrencoder.penalty(code.rows, code.size))
+        self.assertEqual(code.penalty, code.score())
+
+    def test_suffix_template(self):
+        for mask in (4, None):
+            template = qrencoder.SuffixTemplate(b'SERIAL-', 6, 'M', mask=mask)
+            for suffix in (b'000000', b'123456', b'\xff\x00zZ9!'):
+                expected = qrencoder.make(b'SERIAL-' + suffix, 'M', mask=mask)
+                code = template.make(suffix)
+                self.assertEqual(code.rows, expected.rows)
+                self.assertEqual(code.mask, expected.mask)
+
+    def test_too_long(self):
+        self.assertRaises(ValueError, qrencoder.make, bytes(1274), 'H')
+        self.assertRaises(ValueError, qrencoder.make, b'x', 'X')
+
+
+if __name__ == '__main__':
+    unittest.main()
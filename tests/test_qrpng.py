@@ -0,0 +1,156 @@
+import io
+import os
+import shutil
+import struct
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import qrencoder
+import qrpng
+
+
+def read_png(data):
+    """Returns (width, height, rows of pixels, 0 for black and 1 for white)
+    of a 1-bit grayscale PNG, checking its chunks on the way."""
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    offset = 8
+    chunks = []
+    while offset < len(data):
+        length, = struct.unpack_from('>I', data, offset)
+        kind = data[offset + 4:offset + 8]
+        body = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack_from('>I', data, offset + 8 + length)
+        assert crc == zlib.crc32(kind + body) & 0xffffffff, kind
+        chunks.append((kind, body))
+        offset += 12 + length
+    assert [k for k, _ in chunks] == [b'IHDR', b'IDAT', b'IEND']
+    width, height, depth, color, _, _, interlace = \
+        struct.unpack('>IIBBBBB', chunks[0][1])
+    assert (depth, color, interlace) == (1, 0, 0)
+    raw = zlib.decompress(chunks[1][1])
+    stride = (width + 7) // 8
+    assert len(raw) == height * (stride + 1)
+    pixels = []
+    previous = bytes(stride)
+    for y in range(height):
+        line = raw[y * (stride + 1):(y + 1) * (stride + 1)]
+        kind, line = line[0], line[1:]
+        if kind == 2:
+            line = bytes((a + b) & 0xff for a, b in zip(line, previous))
+        else:
+            assert kind == 0, kind
+        previous = line
+        bits = ''.join(format(b, '08b') for b in line)[:width]
+        pixels.append([int(b) for b in bits])
+    return width, height, pixels
+
+
+def expected_pixels(matrix, pixel_size, margin_size):
+    size = len(matrix)
+    light = [1] * ((size + 2 * margin_size) * pixel_size)
+    margin = [light] * (margin_size * pixel_size)
+    rows = []
+    for row in matrix:
+        line = [1] * (margin_size * pixel_size)
+        for module in row:
+            line.extend([0 if module else 1] * pixel_size)
+        line.extend([1] * (margin_size * pixel_size))
+        rows.extend([line] * pixel_size)
+    return margin + rows + margin
+
+
+class PngTest(unittest.TestCase):
+
+    def setUp(self):
+        self.code = qrencoder.make(b'https://example.com/t/000123', 'M', mask=2)
+
+    def check(self, png, matrix, pixel_size, margin_size):
+        side = (len(matrix) + 2 * margin_size) * pixel_size
+        self.assertEqual(read_png(png), (
+            side, side, expected_pixels(matrix, pixel_size, margin_size)
+        ))
+
+    def test_pixels(self):
+        matrix = self.code.matrix()
+        for pixel_size, margin_size in ((1, 0), (3, 4), (4, 2), (7, 1)):
+            for compression in ('fast', 'default', 'small', 0, 9):
+                png = qrpng.png_bytes(self.code.rows, pixel_size, margin_size,
+                                      compression)
+                self.check(png, matrix, pixel_size, margin_size)
+
+    def test_rows_as_ints_or_booleans(self):
+        matrix = self.code.matrix()
+        self.assertEqual(
+            read_png(qrpng.png_bytes(matrix, 2, 3)),
+            read_png(qrpng.png_bytes(self.code.rows, 2, 3))
+        )
+        # widths that aren't whole bytes, for the modules and the scanline
+        matrix = [[True, False, True], [False, True, False], [True, True, False]]
+        self.check(qrpng.png_bytes(matrix, 1, 1), matrix, 1, 1)
+        self.check(qrpng.png_bytes([5, 2, 6], 5, 2), matrix, 5, 2)
+
+    def test_bad_compression(self):
+        self.assertRaises(ValueError, qrpng.png_bytes, self.code.rows, 3, 4, 'tiny')
+        self.assertRaises(ValueError, qrpng.png_bytes, self.code.rows, 3, 4, 10)
+
+    def test_write_png(self):
+        target = io.BytesIO()
+        qrpng.write_png(self.code.rows, target, 2, 1)
+        self.check(target.getvalue(), self.code.matrix(), 2, 1)
+
+
+class ArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.codes = [
+            ('a', qrencoder.make(b'first', 'L')),
+            ('b.png', qrencoder.make(b'second', 'H')),
+        ]
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def items(self):
+        yield 'a', self.codes[0][1].rows
+        # PNG made beforehand
+        yield 'b.png', qrpng.png_bytes(self.codes[1][1].matrix(), 3, 4)
+
+    def check(self, names, read):
+        self.assertEqual(names, ['a.png', 'b.png'])
+        for (_, code), name in zip(self.codes, names):
+            self.assertEqual(read_png(read(name))[2],
+                             expected_pixels(code.matrix(), 3, 4))
+
+    def test_tar(self):
+        path = os.path.join(self.directory, 'codes.tar')
+        self.assertEqual(qrpng.write_archive(self.items(), path), 2)
+        with tarfile.open(path) as archive:
+            self.check(archive.getnames(),
+                       lambda name: archive.extractfile(name).read())
+
+    def test_tar_stream(self):
+        target = io.BytesIO()
+        self.assertEqual(qrpng.write_archive(self.items(), target, 'tar'), 2)
+        target.seek(0)
+        with tarfile.open(fileobj=target) as archive:
+            self.check(archive.getnames(),
+                       lambda name: archive.extractfile(name).read())
+
+    def test_zip(self):
+        path = os.path.join(self.directory, 'codes.zip')
+        self.assertEqual(qrpng.write_archive(self.items(), path, 'zip'), 2)
+        with zipfile.ZipFile(path) as archive:
+            self.check(archive.namelist(), archive.read)
+
+    def test_bad_format(self):
+        self.assertRaises(ValueError, qrpng.write_archive, self.items(),
+                          io.BytesIO(), 'rar')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import types
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import qrsandbox
+import qrtools
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def die(status):
+    os._exit(status)
+
+
+class ImageScanner(object):
+    """The scanner of a stub zbar module that never finishes a scan."""
+
+    def parse_config(self, config):
+        pass
+
+    def scan(self, image):
+        time.sleep(60)
+
+
+class SandboxTest(unittest.TestCase):
+
+    def setUp(self):
+        self.box = qrsandbox.Sandbox()
+        self.addCleanup(self.box.close)
+
+    def test_result(self):
+        self.assertEqual(self.box.run(sleep, (0,)), 0)
+        # the worker is kept for the next call
+        process = self.box.process
+        self.assertEqual(self.box.run(sleep, (0.01,), timeout=5), 0.01)
+        self.assertIs(self.box.process, process)
+
+    def test_exception_is_raised_again(self):
+        with self.assertRaises(ValueError) as raised:
+            self.box.run(fail, ('bad image',))
+        self.assertEqual(str(raised.exception), 'bad image')
+        # the worker survives it
+        self.assertEqual(self.box.run(sleep, (0,)), 0)
+
+    def test_timeout_kills_the_worker(self):
+        start = time.time()
+        self.assertRaises(qrsandbox.Timeout, self.box.run, sleep, (60,), 0.2)
+        self.assertLess(time.time() - start, 10)
+        self.assertIsNone(self.box.process)
+        self.assertEqual(self.box.run(sleep, (0,)), 0)
+
+    def test_dead_worker(self):
+        with self.assertRaises(RuntimeError) as raised:
+            self.box.run(die, (3,))
+        self.assertIn('status 3', str(raised.exception))
+        self.assertIsNone(self.box.process)
+        self.assertEqual(self.box.run(sleep, (0,)), 0)
+
+    def test_sandbox_per_thread_and_limit(self):
+        self.assertIs(qrsandbox.sandbox(), qrsandbox.sandbox())
+        self.assertIsNot(qrsandbox.sandbox(), qrsandbox.sandbox(1 << 30))
+
+
+class DecodeTimeoutTest(unittest.TestCase):
+
+    def setUp(self):
+        self.zbar = sys.modules.get('zbar')
+        # the forked worker inherits the stub
+        sys.modules['zbar'] = types.ModuleType('zbar')
+        sys.modules['zbar'].ImageScanner = ImageScanner
+        sys.modules['zbar'].Image = lambda width, height, format, raw: None
+
+    def tearDown(self):
+        if self.zbar is None:
+            del sys.modules['zbar']
+        else:
+            sys.modules['zbar'] = self.zbar
+        qrsandbox.sandbox().close()
+
+    def test_decode_timeout(self):
+        found = qrtools.decode_y800(bytes(64), 8, 8, timeout=0.2)
+        self.assertIsInstance(found, qrtools.DecodeTimeout)
+        self.assertEqual(found, [])
+        self.assertEqual(found.seconds, 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
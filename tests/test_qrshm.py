@@ -0,0 +1,139 @@
+import os
+import sys
+import threading
+import time
+import types
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import qrshm
+
+
+class Symbol(object):
+
+    def __init__(self, data):
+        self.data = data
+
+
+class Image(object):
+    """Takes the frame's bytes up to the first zero byte as the data of one
+    symbol; a frame starting with ! makes the scan fail."""
+
+    def __init__(self, width, height, format, raw):
+        if not isinstance(raw, bytes):
+            # like the real bindings
+            raise TypeError('image data must be bytes')
+        self.raw = raw
+        self.symbols = []
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+
+class ImageScanner(object):
+
+    def parse_config(self, config):
+        pass
+
+    def scan(self, image):
+        if image.raw.startswith(b'!'):
+            raise RuntimeError('unreadable frame')
+        data = image.raw.split(b'\0', 1)[0]
+        image.symbols = [Symbol(data)] if data else []
+        return len(image.symbols)
+
+
+def frame(text, size=64):
+    return text.encode('utf-8').ljust(size, b'\0')
+
+
+class FrameRingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.zbar = sys.modules.get('zbar')
+        sys.modules['zbar'] = types.ModuleType('zbar')
+        sys.modules['zbar'].Image = Image
+        sys.modules['zbar'].ImageScanner = ImageScanner
+        self.ring = qrshm.FrameRing(slots=4, max_width=8, max_height=8,
+                                    result_size=64)
+        self.worker = None
+
+    def tearDown(self):
+        if self.worker is not None:
+            self.ring.stop()
+            self.worker.join()
+        self.ring.close()
+        if self.zbar is None:
+            del sys.modules['zbar']
+        else:
+            sys.modules['zbar'] = self.zbar
+
+    def start(self):
+        # a worker thread rather than a process, so it sees the stub zbar
+        self.worker = threading.Thread(
+            target=qrshm.serve, args=(self.ring.name, 0, 1, 0.001)
+        )
+        self.worker.start()
+
+    def wait(self, count):
+        results = []
+        deadline = time.time() + 5
+        while len(results) < count and time.time() < deadline:
+            results.extend(self.ring.results())
+            time.sleep(0.005)
+        return results
+
+    def test_put_and_results(self):
+        self.start()
+        sequences = [self.ring.put(frame('frame %d' % i), 8, 8, timestamp=i)
+                     for i in range(3)]
+        self.assertEqual(sequences, [1, 2, 3])
+        self.assertEqual(self.wait(3), [
+            (1, 0.0, ('frame 0',), None),
+            (2, 1.0, ('frame 1',), None),
+            (3, 2.0, ('frame 2',), None),
+        ])
+        # the slots are free again
+        self.assertEqual(self.ring.put(frame(''), 8, 8, timestamp=3), 4)
+        self.assertEqual(self.wait(1), [(4, 3.0, (), None)])
+
+    def test_error_flag(self):
+        self.start()
+        self.ring.put(frame('!'), 8, 8, timestamp=0)
+        self.assertEqual(self.wait(1), [
+            (1, 0.0, (), 'RuntimeError: unreadable frame')
+        ])
+
+    def test_sequence_check(self):
+        sequence = self.ring.put(frame('late'), 8, 8, timestamp=0)
+        trailer = self.ring.trailer(0)
+        # as a worker could see it if the pixels weren't visible yet
+        qrshm.SLOT_TRAILER.pack_into(self.ring.buf, trailer, 0)
+        self.start()
+        time.sleep(0.05)
+        self.assertEqual(self.ring.state(0), qrshm.READY)
+        self.assertEqual(self.ring.results(), [])
+        qrshm.SLOT_TRAILER.pack_into(self.ring.buf, trailer, sequence)
+        self.assertEqual(self.wait(1), [(1, 0.0, ('late',), None)])
+
+    def test_drop_when_all_slots_are_busy(self):
+        for i in range(4):
+            self.assertEqual(self.ring.put(frame('x'), 8, 8), i + 1)
+        self.assertIsNone(self.ring.put(frame('x'), 8, 8))
+        self.assertEqual(self.ring.dropped, 1)
+        self.assertEqual(self.ring.sequence, 4)
+
+    def test_frame_too_large(self):
+        self.assertRaises(ValueError, self.ring.put, bytes(81), 9, 9)
+
+
+class ResultTest(unittest.TestCase):
+
+    def test_pack_leaves_out_what_does_not_fit(self):
+        packed = qrshm.pack_result(('abc', 'd\xe9f', 'x' * 100), 32)
+        self.assertEqual(qrshm.unpack_result(packed), ('abc', 'd\xe9f'))
+
+
+if __name__ == '__main__':
+    unittest.main()
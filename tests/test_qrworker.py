@@ -0,0 +1,148 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import qrworker
+
+
+class FakeRedis(object):
+    """The Redis commands RedisQueue uses, on dicts and lists, returning
+    bytes like redis.Redis does."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.lists = {}
+
+    def _bytes(self, value):
+        return value if isinstance(value, bytes) else str(value).encode('utf-8')
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(self._bytes(field))
+
+    def hset(self, key, field, value):
+        h = self.hashes.setdefault(key, {})
+        new = self._bytes(field) not in h
+        h[self._bytes(field)] = self._bytes(value)
+        return int(new)
+
+    def hsetnx(self, key, field, value):
+        h = self.hashes.setdefault(key, {})
+        if self._bytes(field) in h:
+            return 0
+        h[self._bytes(field)] = self._bytes(value)
+        return 1
+
+    def hdel(self, key, field):
+        return int(self.hashes.get(key, {}).pop(self._bytes(field), None) is not None)
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, self._bytes(value))
+        return len(self.lists[key])
+
+    def rpoplpush(self, source, destination):
+        items = self.lists.get(source)
+        if not items:
+            return None
+        value = items.pop()
+        self.lists.setdefault(destination, []).insert(0, value)
+        return value
+
+    def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        value = self._bytes(value)
+        removed = 0
+        while value in items and (count == 0 or removed < count):
+            items.remove(value)
+            removed += 1
+        return removed
+
+    def lrange(self, key, start, end):
+        items = self.lists.get(key, [])
+        return list(items[start:None if end == -1 else end + 1])
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+
+class QueueTests(object):
+
+    def test_put_is_idempotent(self):
+        queue = self.make_queue()
+        queue.put('a', 'a.png')
+        queue.put('a', 'a.png')
+        self.assertEqual(queue.reserve(10), [('a', 'a.png')])
+        self.assertEqual(queue.reserve(10), [])
+
+    def test_ack_is_idempotent(self):
+        queue = self.make_queue()
+        queue.put('a', 'a.png')
+        queue.put('b', 'b.png')
+        self.assertEqual(len(queue.reserve(10)), 2)
+        self.assertTrue(queue.ack('a', 'data'))
+        self.assertFalse(queue.ack('a', 'other'))
+        self.assertTrue(queue.ack('b', None, 'IOError: missing'))
+        self.assertEqual(queue.result('a'), ('data', None))
+        self.assertEqual(queue.result('b'), (None, 'IOError: missing'))
+        self.assertEqual(queue.pending(), 0)
+
+    def test_result_of_unfinished_job(self):
+        queue = self.make_queue()
+        queue.put('a', 'a.png')
+        self.assertRaises(KeyError, queue.result, 'a')
+
+    def test_expired_lease_is_handed_out_again(self):
+        queue = self.make_queue(lease=-1)
+        queue.put('a', 'a.png')
+        self.assertEqual(queue.reserve(), [('a', 'a.png')])
+        self.assertEqual(queue.reserve(), [('a', 'a.png')])
+
+    def test_live_lease_is_kept(self):
+        queue = self.make_queue(lease=300)
+        queue.put('a', 'a.png')
+        self.assertEqual(queue.reserve(), [('a', 'a.png')])
+        self.assertEqual(queue.reserve(), [])
+        self.assertEqual(queue.pending(), 1)
+
+    def test_shards(self):
+        queue = self.make_queue(shards=4)
+        for i in range(20):
+            queue.put('job%d' % i, 'job%d.png' % i)
+        jobs = []
+        for shard in range(4):
+            reserved = queue.reserve(100, [shard])
+            self.assertTrue(all(qrworker.shard_of(j, 4) == shard for j, _ in reserved))
+            jobs.extend(reserved)
+        self.assertEqual(len(jobs), 20)
+
+
+class RedisQueueTest(QueueTests, unittest.TestCase):
+
+    def make_queue(self, shards=1, lease=300):
+        return qrworker.RedisQueue(FakeRedis(), shards=shards, lease=lease)
+
+    def test_requeue_leaves_live_jobs(self):
+        queue = self.make_queue(lease=300)
+        queue.put('a', 'a.png')
+        queue.reserve()
+        queue.requeue()
+        self.assertEqual(queue.reserve(), [])
+
+
+class SQLiteQueueTest(QueueTests, unittest.TestCase):
+
+    def make_queue(self, shards=1, lease=300):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        queue = qrworker.SQLiteQueue(
+            os.path.join(directory, 'jobs.db'), shards=shards, lease=lease
+        )
+        self.addCleanup(queue.close)
+        return queue
+
+
+if __name__ == '__main__':
+    unittest.main()
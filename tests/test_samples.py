@@ -0,0 +1,64 @@
+import glob
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from qrtools import QR
+
+SAMPLES = os.path.join(os.path.dirname(__file__), '..', 'samples')
+
+# sample file name -> data type it decodes as
+EXPECTED = {
+    'bookmark': 'bookmark',
+    'email-address': 'email',
+    'email-message': 'emailmessage',
+    'geo': 'geo',
+    'mms': 'mms',
+    'phonebook': 'phonebook',
+    'sms': 'sms',
+    'telephone': 'telephone',
+    'text-non-ascii': 'text',
+    'text-plain': 'text',
+    'url': 'url',
+}
+
+
+def missing():
+    """Returns the name of the first decoding dependency that isn't
+    installed, or None."""
+    try:
+        import zbar
+    except ImportError:
+        return 'zbar'
+    try:
+        from PIL import Image
+    except ImportError:
+        return 'PIL'
+    return None
+
+
+@unittest.skipIf(missing(), 'decoding needs %s' % missing())
+class SamplesTest(unittest.TestCase):
+
+    def test_every_sample_is_listed(self):
+        names = set(
+            os.path.splitext(os.path.basename(f))[0]
+            for f in glob.glob(os.path.join(SAMPLES, '*.png'))
+        )
+        self.assertEqual(names, set(EXPECTED))
+
+    def test_data_types(self):
+        for name, data_type in sorted(EXPECTED.items()):
+            with self.subTest(sample=name):
+                qr = QR()
+                try:
+                    self.assertTrue(qr.decode(os.path.join(SAMPLES, name + '.png')))
+                    self.assertEqual(qr.data_type, data_type)
+                finally:
+                    qr.destroy()
+
+
+if __name__ == '__main__':
+    unittest.main()